@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: fitting text in the logo area (addText).
+Compares the old way (lower the font size 1 point at a time, load the font
+file for every size) with fit_text (binary search + cached font loader).
+Reports the number of font file loads and the time per fit.
+
+    python benchmarks/bench_addtext.py [FONT_FILE]
+
+FONT_FILE: any .ttf file. Default: $WEBEXLOGO_FONT or a common system font.
+"""
+import os
+import sys
+import time
+
+FONT_CANDIDATES = ["arial.ttf", "Arial.ttf", "/Library/Fonts/Arial.ttf",
+                   "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                   "/usr/share/fonts/TTF/DejaVuSans.ttf", "C:/Windows/Fonts/arial.ttf"]
+CASES = [   # (name, text, max font size, area width, area height)
+    ("short, fits", "Welcome ACME", 36, 600, 400),
+    ("long line", "Welcome to the quarterly business review with ACME Corporation", 120, 600, 400),
+    ("multi-line", "##".join(["Welcome ACME Corporation"] * 6), 200, 500, 300),
+    ("tiny area", "##".join(["Quarterly business review 2026"] * 4), 300, 300, 120),
+]
+REPEAT = 5
+
+
+def find_font():
+    fonts = sys.argv[1:2] + [os.environ.get("WEBEXLOGO_FONT", "")] + FONT_CANDIDATES
+    for fontfile in fonts:
+        if fontfile and os.path.isfile(fontfile):
+            return os.path.abspath(fontfile)
+    print("No font file found: run with a .ttf file as argument")
+    exit(1)
+
+
+# ___ import the render functions (no settings file needed)
+def import_render():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from webexlogo import render
+    return render
+
+
+# ___ the old addText loop: 1 point smaller per step, new font object per step
+def old_fit(render, msg, fontfile, fontsize, max_w, max_h):
+    from PIL import ImageFont
+    my_font = ImageFont.truetype(fontfile, fontsize)
+    left, top, right, bottom = render.text_box(msg, my_font)
+    while right - left > max_w or bottom - top > max_h:
+        fontsize -= 1
+        my_font = ImageFont.truetype(fontfile, fontsize)
+        left, top, right, bottom = render.text_box(msg, my_font)
+    return fontsize
+
+
+def main():
+    fontfile = find_font()
+    render = import_render()
+    from PIL import ImageFont
+    truetype = ImageFont.truetype
+    font_loads = [0]
+
+    def counting_truetype(*args, **kwargs):
+        font_loads[0] += 1
+        return truetype(*args, **kwargs)
+    ImageFont.truetype = counting_truetype
+
+    print(f"font: {fontfile}")
+    print(f"{'case':<14}{'size':>6}{'old loads':>11}{'old ms':>9}{'new loads':>11}{'new ms':>9}{'2nd run ms':>12}")
+    for name, text, fontsize, max_w, max_h in CASES:
+        msg = text.replace("##", "\n")
+        font_loads[0] = 0
+        start_time = time.perf_counter()
+        for _ in range(REPEAT):
+            old_size = old_fit(render, msg, fontfile, fontsize, max_w, max_h)
+        old_time = (time.perf_counter() - start_time) / REPEAT
+        old_loads = font_loads[0] // REPEAT
+
+        render.load_font.cache_clear()
+        font_loads[0] = 0
+        start_time = time.perf_counter()
+        new_size = render.fit_text(msg, fontfile, fontsize, max_w, max_h)[0]
+        new_time = time.perf_counter() - start_time
+        new_loads = font_loads[0]
+        start_time = time.perf_counter()
+        render.fit_text(msg, fontfile, fontsize, max_w, max_h)   # fonts now cached
+        cached_time = time.perf_counter() - start_time
+        size = f"{new_size}" if new_size == old_size else f"{new_size}!={old_size}"
+        print(f"{name:<14}{size:>6}{old_loads:>11}{old_time*1000:>9.1f}{new_loads:>11}{new_time*1000:>9.1f}{cached_time*1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: startup time per command.
+Runs 'python -X importtime -m webexlogo COMMAND' in a temp folder with a
+settings file, a small base image and logo. The video device address refuses
+connections, so every command stops at its first xAPI call: the time measured
+is startup + imports + work before talking to the device.
+Reports wall time, import time and whether Pillow/requests were loaded,
+compared with a bare interpreter ('python -c pass').
+
+    python benchmarks/bench_startup.py [OLD_WEBEXLOGO_PY]
+
+OLD_WEBEXLOGO_PY: optional single-file version to compare with, e.g.
+    git show <commit>:webexlogo.py > /tmp/webexlogo_old.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+COMMANDS = ["help", "user2", "clear", "logo.png", "text Hello##World"]
+REPEAT = 5
+PACKAGE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ___ temp folder with settings, base image and logo. Device: 127.0.0.1:1 (refused)
+def make_workdir():
+    from PIL import Image
+    workdir = tempfile.mkdtemp(prefix="webexlogo_bench_")
+    Image.new("RGB", (1920, 1080), "navy").save(workdir + "/base.jpg")
+    os.mkdir(workdir + "/logos")
+    Image.new("RGBA", (400, 200), "orange").save(workdir + "/logos/logo.png")
+    with open(workdir + "/webexlogo_settings.ini", "w") as f:
+        f.write("[Settings]\nendpoint_ip = 127.0.0.1:1\nmy_inputfile = base.jpg\nmy_logofolder = logos\n"
+                "my_token_xapi = dGVzdA==\nmy_user_image_location = User3\nmy_local_domain_toignore = \n"
+                "logo_start = 1200x100\nlogo_end = 1800x500\nscale_logo = True\nmy_fontsize = 36\n"
+                "my_fontcolor = yellow\nmy_fontfile = \nrender_cache_mb = 0\n")
+    return workdir
+
+
+# ___ run once. RETURNS: wall time, import time (seconds), imported top-level modules
+def run(arguments, workdir, env):
+    start_time = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=workdir, env=env,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_time = time.perf_counter() - start_time
+    import_us, modules = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        import_us += int(self_us)
+        modules.add(name.strip().split(".")[0])
+    return wall_time, import_us / 1e6, modules
+
+
+def measure(name, arguments, workdir, env):
+    runs = [run(arguments, workdir, env) for _ in range(REPEAT)]
+    wall_time = statistics.median(wall for wall, _, _ in runs)
+    import_time = statistics.median(imports for _, imports, _ in runs)
+    modules = runs[-1][2]
+    loaded = ",".join(module for module in ["PIL", "requests"] if module in modules) or "-"
+    print(f"{name:<28}{wall_time*1000:>9.1f}{import_time*1000:>11.1f}   {loaded}")
+    return wall_time
+
+
+def main():
+    workdir = make_workdir()
+    env = dict(os.environ, PYTHONPATH=PACKAGE_FOLDER)
+    old_script = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"python {sys.version.split()[0]}, median of {REPEAT} runs, folder {workdir}")
+    print(f"{'command':<28}{'wall ms':>9}{'import ms':>11}   loaded")
+    bare_time = measure("(bare interpreter)", ["-c", "pass"], workdir, env)
+    for command in COMMANDS:
+        wall_time = measure(command, ["-m", "webexlogo"] + command.split(" "), workdir, env)
+        if old_script:
+            measure("  old: " + command, [old_script] + command.split(" "), workdir, env)
+        if command == "user2":
+            print(f"{'  = bare interpreter +':<28}{(wall_time - bare_time)*1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
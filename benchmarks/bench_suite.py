@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite: every stage of a background update, with 1080p and 4K base
+images, small and huge logos and long multi-line text:
+  resize     resizeLogo: lanczos (default) and nearest
+  text       addText, and the text layer from the text cache pasted on the base image
+  base       open the base image: decode (no base cache) or map the raw file
+  paste      paste_logo: alpha blend a transparent logo on the (mapped) base image,
+             compared with a plain paste (no blending, as before logo_resample)
+  encode     encode_image: jpeg, with a byte budget, with a PSNR floor
+  base64     the upload body (UploadBody, base64 per chunk)
+  xapi       upload/switch to a fake device (benchmarks/fakedevice.py): no delay,
+             latency, slow upload, error response; read 1000 call participants
+             (500 per page, and from a device that returns max 100 per page)
+  participants  count the domains of a 1000 participant list: streamed (device.py)
+             and a full tree with a list of ignored domains (as before)
+  fit        new background photo (6000x4000 jpg): full decode, or draft decode +
+             resize/crop to device_resolution 1920x1080 (open_fitted); and the
+             whole background (build) as is and at 1080p
+  build      build_background: all render stages together (no render cache), one
+             logo and 3 logos in a grid (one decode/encode for all logos)
+Images are synthetic (gradient + noise), so runs on any machine are comparable.
+
+    python benchmarks/bench_suite.py [--repeat N] [--only TEXT] [--json FILE]
+                                     [--compare FILE] [--threshold PCT] [FONT_FILE]
+
+--json FILE      save the results (with commit, python and Pillow version)
+--compare FILE   compare with saved results, mark stages that got slower than
+                 --threshold percent (default 10) as REGRESSION
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PACKAGE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_FOLDER)
+from PIL import Image
+import PIL
+from webexlogo.settings import Settings, emaildomains
+from webexlogo.device import DeviceClient, UploadBody, xapi_close_connections, count_participant_domains
+from webexlogo import render, backgrounds
+from fakedevice import FakeDevice, participant_xml
+from bench_addtext import FONT_CANDIDATES
+
+RESOLUTIONS = {     # name -> base image size, logo area start, logo area end
+    "1080p": ((1920, 1080), "1200x100", "1800x500"),
+    "4K": ((3840, 2160), "2400x200", "3600x1000"),
+}
+LOGOS = {"small": (200, 80), "huge": (5000, 2500)}
+LONG_TEXT = "##".join(["Welcome to the quarterly business review with ACME Corporation"] * 5)
+TOKEN = "dGVzdDp0ZXN0"
+
+
+# ___ synthetic image: gradient + noise (compresses like a photo, not like a flat color)
+def make_image(size, mode="RGB"):
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if mode == "RGBA":
+        image.putalpha(Image.radial_gradient("L").resize(size))
+    return image
+
+
+def make_settings(workdir, resolution, fontfile):
+    size, logo_start, logo_end = RESOLUTIONS[resolution]
+    base_file = f"{workdir}/base_{resolution}.jpg"
+    if not os.path.isfile(base_file):
+        make_image(size).save(base_file, quality=90)
+    return Settings.from_values(endpoint_ip="127.0.0.1", my_inputfile=base_file, my_logofolder=workdir,
+                                my_token_xapi=TOKEN, my_user_image_location="User3", my_local_domain_toignore="",
+                                logo_start=logo_start, logo_end=logo_end, scale_logo=True, my_fontsize=300,
+                                my_fontcolor="yellow", my_fontfile=fontfile, render_cache_mb=0, device_resolution=0)
+
+
+def find_font(fontfile):
+    for candidate in [fontfile, os.environ.get("WEBEXLOGO_FONT", "")] + FONT_CANDIDATES:
+        if candidate and os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    return None
+
+
+# ___ all benchmark cases. RETURNS: list of (name, setup function). setup returns the
+#     function to time, so creating inputs is not part of the measured time
+def benchmark_cases(workdir, fontfile):
+    cases = []
+    for resolution in RESOLUTIONS:
+        settings = make_settings(workdir, resolution, fontfile)
+        base = backgrounds.open_base_image(settings)
+        for logo_name, logo_size in LOGOS.items():
+            logo_file = f"{workdir}/logo_{logo_name}.png"
+            if not os.path.isfile(logo_file):
+                make_image(logo_size, "RGBA").save(logo_file)
+
+            for resample in ["lanczos", "nearest"]:
+                def resize(settings=settings, logo_file=logo_file, resample=resample):
+                    logo = Image.open(logo_file)
+                    logo.load()
+                    return lambda: render.resizeLogo(logo, settings.max_w, settings.max_h, settings.scale_logo,
+                                                     settings.middle_x, settings.middle_y, resample)
+                cases.append((f"resize {logo_name} logo {resample} {resolution}", resize))
+
+            def build(settings=settings, logo_file=logo_file):
+                render_parts = backgrounds.logo_render_parts(settings, logo_file) + backgrounds.encode_render_parts(settings)
+                return lambda: backgrounds.build_background(settings, render_parts, logo_file, save_result=False)
+            cases.append((f"build {logo_name} logo {resolution}", build))
+
+        def build_logos(settings=settings):
+            logo_files = [f"{workdir}/logo_small.png", f"{workdir}/logo_huge.png", f"{workdir}/logo_small.png"]
+            render_parts = backgrounds.logo_render_parts(settings, logo_files) + backgrounds.encode_render_parts(settings)
+            return lambda: backgrounds.build_background(settings, render_parts, logo_files, save_result=False)
+        cases.append((f"build 3 logos {resolution}", build_logos))
+
+        def decode_base(settings=settings):
+            return lambda: Image.open(settings.my_inputfile).load()
+        cases.append((f"base decode {resolution}", decode_base))
+
+        def map_base(settings=settings):
+            return lambda: backgrounds.open_base_image(settings)
+        cases.append((f"base map {resolution}", map_base))
+
+        for paste_name, paste_function in [("", render.paste_logo),
+                                           (" without alpha", lambda base, logo, x, y: base.paste(logo, (x, y)))]:
+            def paste(settings=settings, paste_function=paste_function):
+                logo, x, y = render.resizeLogo(Image.open(f"{workdir}/logo_small.png"), settings.max_w, settings.max_h,
+                                               settings.scale_logo, settings.middle_x, settings.middle_y)
+                return lambda: paste_function(backgrounds.open_base_image(settings), logo, x, y)
+            cases.append((f"paste logo{paste_name} {resolution}", paste))
+
+        if fontfile:
+            def text(settings=settings):
+                return lambda: render.addText(backgrounds.open_base_image(settings), LONG_TEXT, settings.my_fontsize, settings)
+            cases.append((f"text long multi-line {resolution}", text))
+
+            def text_cached(settings=settings):     # text layer from _textcache: fit + draw skipped
+                cache_settings = copy.copy(settings)
+                cache_settings.render_cache_mb = 200
+                backgrounds.open_text_layer(cache_settings, LONG_TEXT, settings)
+
+                def paste_text():
+                    backgrounds.text_layers.clear()     # read from the file, as in a new run
+                    imText, x, y, fontsize = backgrounds.open_text_layer(cache_settings, LONG_TEXT, settings)
+                    return render.paste_logo(backgrounds.open_base_image(settings), imText, settings.middle_x + x, settings.middle_y + y)
+                return paste_text
+            cases.append((f"text long multi-line cached layer {resolution}", text_cached))
+
+        for encode_name, encode_arguments in [("jpg", {}), ("jpg 300kB budget", {"max_bytes": 300 * 1024}),
+                                              ("jpg 38dB floor", {"min_psnr": 38})]:
+            def encode(base=base, encode_arguments=encode_arguments):
+                return lambda: render.encode_image(base, **encode_arguments)
+            cases.append((f"encode {encode_name} {resolution}", encode))
+
+        def base64_body(base=base):
+            body = UploadBody("User3", render.encode_image(base)[0])
+            return lambda: sum(len(chunk) for chunk in body)
+        cases.append((f"base64 jpg {resolution}", base64_body))
+
+    # --- new background photo, larger than the device
+    photo_file = f"{workdir}/photo_6000x4000.jpg"
+    make_image((6000, 4000)).save(photo_file, quality=90)
+
+    def decode_photo():
+        return lambda: Image.open(photo_file).load()
+    cases.append(("fit photo 6000x4000 full decode", decode_photo))
+
+    def fit_photo():
+        return lambda: render.open_fitted(photo_file, (1920, 1080))
+    cases.append(("fit photo 6000x4000 to 1080p", fit_photo))
+
+    for resolution_name, device_resolution in [("as is", 0), ("1080p", "1920x1080")]:
+        def build_photo(device_resolution=device_resolution):
+            settings = Settings.from_values(**dict(make_settings(workdir, "1080p", fontfile).config["Settings"],
+                                                   device_resolution=device_resolution))
+            render_parts = ["background", backgrounds.file_digest(photo_file)] + backgrounds.encode_render_parts(settings)
+            return lambda: backgrounds.build_background(settings, render_parts, photo_file, save_result=False)
+        cases.append((f"build photo background {resolution_name}", build_photo))
+
+    # --- uploads to a fake device: (name, FakeDevice arguments, payload)
+    upload_jpg = render.encode_image(backgrounds.open_base_image(make_settings(workdir, "1080p", fontfile)))[0]
+    switch_xml = "<Command><Cameras><Background><Set><Image>User3</Image><Mode>Image</Mode></Set></Background></Cameras></Command>"
+    for name, device_arguments, payload in [
+            ("xapi switch", {}, switch_xml),
+            ("xapi switch 20ms latency", {"latency": 0.02}, switch_xml),
+            ("xapi upload jpg 1080p", {}, UploadBody("User3", upload_jpg)),
+            ("xapi upload jpg 1080p 20ms latency", {"latency": 0.02}, UploadBody("User3", upload_jpg)),
+            ("xapi upload jpg 1080p 100Mbit", {"upload_kbps": 100000}, UploadBody("User3", upload_jpg)),
+            ("xapi upload error response", {"error_command": "<Upload>"}, UploadBody("User3", upload_jpg))]:
+
+        def xapi(device_arguments=device_arguments, payload=payload, name=name):
+            device = FakeDevice(**device_arguments).start()
+            devices.append(device)
+            client = DeviceClient(device.address, TOKEN)
+            result = client.xapiCall(payload, False)
+            expect_error = "error" in name
+            if ("**ERROR**" in result) != expect_error:
+                print(f"     **ERROR** {name}: unexpected result {result}")
+            return lambda: client.xapiCall(payload, False)
+        cases.append((name, xapi))
+
+    for name, page_limit in [("xapi participants 1000 (2 pages)", None),
+                             ("xapi participants 1000 (device max 100 per page)", 100)]:
+        def xapi_participants(name=name, page_limit=page_limit):
+            device = FakeDevice(participants=1000, page_limit=page_limit).start()
+            devices.append(device)
+            client = DeviceClient(device.address, TOKEN)
+            participants = client.count_call_domains(emaildomains, raise_on_error=False)[1]
+            if participants != 1000:
+                print(f"     **ERROR** {name}: {participants} of 1000 participants read")
+            return lambda: client.count_call_domains(emaildomains, raise_on_error=False)
+        cases.append((name, xapi_participants))
+
+    # --- participant list of a large call
+    participants_1000 = participant_xml(1000)
+
+    def parse_streamed():
+        ignored_domains = set(emaildomains) | {"cisco.com"}
+        return lambda: count_participant_domains(participants_1000, ignored_domains)
+    cases.append(("participants 1000 streamed", parse_streamed))
+
+    def parse_tree():
+        import xml.etree.ElementTree as ET
+        ignored_domains = list(emaildomains) + ["cisco.com"]
+
+        def count_domains():
+            domain_counts = dict()
+            for elem in ET.fromstring(participants_1000).iter():
+                if elem.tag == "Email" and elem.text.split("@")[1] not in ignored_domains:
+                    domain_counts[elem.text.split("@")[1]] = domain_counts.get(elem.text.split("@")[1], 0) + 1
+            return max(domain_counts, key=domain_counts.get)
+        return count_domains
+    cases.append(("participants 1000 tree + list", parse_tree))
+    return cases
+
+
+devices = []        # fake devices started by the cases
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_FOLDER, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="webexlogo benchmark suite")
+    parser.add_argument("fontfile", nargs="?", default="")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="only cases with this text in the name")
+    parser.add_argument("--json", help="save results to this file")
+    parser.add_argument("--compare", help="compare with results saved with --json")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold (percent)")
+    arguments = parser.parse_args()
+    fontfile = find_font(arguments.fontfile)
+    workdir = tempfile.mkdtemp(prefix="webexlogo_bench_")
+    previous = None
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            previous = json.load(f)
+        print(f"compare with: commit {previous['commit']}, python {previous['python']}, Pillow {previous['pillow']}")
+    commit = git_commit()
+    print(f"commit {commit}, python {platform.python_version()}, Pillow {PIL.__version__}, "
+          f"median of {arguments.repeat} runs, font: {fontfile or 'none (no text cases)'}")
+    print(f"{'case':<40}{'median ms':>11}{'min ms':>9}" + (f"{'before ms':>11}{'change':>9}" if previous else ""))
+    results = dict()
+    regressions = 0
+    try:
+        for name, setup in benchmark_cases(workdir, fontfile):
+            if arguments.only not in name:
+                continue
+            run = setup()
+            times = []
+            with contextlib.redirect_stdout(io.StringIO()):     # no progress output while timing
+                run()           # warm up: fonts, connections, first decode
+                for _ in range(arguments.repeat):
+                    start_time = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start_time)
+            results[name] = {"median_ms": statistics.median(times) * 1000, "min_ms": min(times) * 1000, "runs": len(times)}
+            line = f"{name:<40}{results[name]['median_ms']:>11.2f}{results[name]['min_ms']:>9.2f}"
+            if previous and name in previous["results"]:
+                before = previous["results"][name]["median_ms"]
+                change = (results[name]["median_ms"] - before) / before * 100
+                line += f"{before:>11.2f}{change:>+8.0f}%"
+                if change > arguments.threshold:
+                    line += "  REGRESSION"
+                    regressions += 1
+            print(line)
+    finally:
+        xapi_close_connections()
+        for device in devices:
+            device.stop()
+    if arguments.json:
+        with open(arguments.json, "w") as f:
+            json.dump({"commit": commit, "python": platform.python_version(), "pillow": PIL.__version__,
+                       "machine": platform.machine(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "results": results}, f, indent=1)
+        print(f"results saved: {arguments.json}")
+    if previous:
+        print(f"{regressions} regression(s) above {arguments.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for a Desk Pro xAPI: HTTPS POST /putxml on 127.0.0.1.
+Answers like a device: background upload/set results, the participant list of
+a call (or 'Call not found'), error responses, 401 without authorization.
+Optional latency per request, a max upload speed (slow network) and a max number
+of participants per response (devices can return fewer than asked).
+
+In a script:
+    with FakeDevice(latency=0.02) as device:
+        client = DeviceClient(device.address, "dGVzdA==")
+
+From the command line (e.g. to try webexlogo.py without a device):
+    python benchmarks/fakedevice.py [--port 8443] [--latency MS] [--upload-kbps N]
+                                    [--error upload|set|participants] [--participants N]
+                                    [--page-limit N]
+
+Needs the 'openssl' command to create a self-signed certificate.
+"""
+import argparse
+import http.server
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+RESULTS = {     # xAPI command in the request -> result element in the response
+    "<Upload>": "BackgroundUploadResult",
+    "<Set>": "BackgroundSetResult",
+    "<ParticipantList>": "ParticipantListSearchResult",
+}
+certificate = None      # (cert file, key file), created once
+
+
+# ___ self-signed certificate for 127.0.0.1 (openssl). RETURNS: cert file, key file
+def make_certificate():
+    global certificate
+    if certificate is None:
+        cert_folder = tempfile.mkdtemp(prefix="webexlogo_fakedevice_")
+        cert_file, key_file = cert_folder + "/cert.pem", cert_folder + "/key.pem"
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "2",
+                        "-subj", "/CN=127.0.0.1", "-keyout", key_file, "-out", cert_file],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        certificate = (cert_file, key_file)
+    return certificate
+
+
+# ___ ParticipantList response with count participants (domains: 2/3 customer, 1/3 own).
+#     Like a device: only the page from offset, max limit participants, plus the total
+def participant_xml(count, offset=0, limit=None):
+    page_end = count if limit is None else min(count, offset + limit)
+    participants = []
+    for number in range(offset, page_end):
+        domain = "cisco.com" if number % 3 == 2 else f"customer{number % 2}.com"
+        participants.append(f'<Participant item="{number + 1}"><DisplayName>User {number}</DisplayName>'
+                            f'<Email>user{number}@{domain}</Email></Participant>')
+    return ('<?xml version="1.0"?><Command><ParticipantListSearchResult status="OK">'
+            + "".join(participants)
+            + f'<ResultInfo><Offset>{offset}</Offset><Limit>{limit or count}</Limit><TotalRows>{count}</TotalRows></ResultInfo>'
+            + '</ParticipantListSearchResult></Command>')
+
+
+# ___ number in <tag>N</tag> of a request. RETURNS: number, None when not in the request
+def request_number(body, tag):
+    match = re.search(rb"<" + tag.encode() + rb">(\d+)</", body)
+    return int(match.group(1)) if match else None
+
+
+class FakeDeviceHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, like the device
+    disable_nagle_algorithm = True      # headers and body are separate writes: don't wait for ACKs
+
+    def do_POST(self):
+        device = self.server.device
+        body = self.read_body(device.upload_rate)
+        if device.latency:
+            time.sleep(device.latency)
+        command = next((command for command in RESULTS if command.encode() in body[:200]), None)
+        with device.lock:
+            device.requests += 1
+            device.bytes_received += len(body)
+        if self.path != "/putxml" or command is None:
+            self.reply(400, b"<Result status=\"Error\"><Reason>Bad request</Reason></Result>")
+        elif "Authorization" not in self.headers:
+            self.reply(401, b"")
+        elif command == device.error_command:
+            self.reply(200, f'<?xml version="1.0"?><Command><{RESULTS[command]} status="Error"><Reason>Fake device error</Reason>'
+                            f'</{RESULTS[command]}></Command>'.encode())
+        elif command == "<ParticipantList>":
+            if device.participants == 0:
+                self.reply(200, b'<?xml version="1.0"?><Command><ParticipantListSearchResult status="Error">'
+                                b'<Reason>Call not found</Reason></ParticipantListSearchResult></Command>')
+            else:
+                limit = request_number(body, "Limit")
+                if device.page_limit:
+                    limit = min(limit or device.page_limit, device.page_limit)
+                self.reply(200, participant_xml(device.participants, request_number(body, "Offset") or 0, limit).encode())
+        else:
+            self.reply(200, f'<?xml version="1.0"?><Command><{RESULTS[command]} status="OK"/></Command>'.encode())
+
+    # ___ read the request body. upload_rate (bytes/s): read it slowly, like a slow network
+    def read_body(self, upload_rate):
+        remaining = int(self.headers.get("Content-Length", 0))
+        chunks, received = [], 0
+        start_time = time.perf_counter()
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            received += len(chunk)
+            if upload_rate:
+                wait = received / upload_rate - (time.perf_counter() - start_time)
+                if wait > 0:
+                    time.sleep(wait)
+        return b"".join(chunks)
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeDevice:
+    """Fake device in a background thread. address: 'host:port' for DeviceClient.
+    latency: seconds per request. upload_kbps: max upload speed (None: no limit).
+    error_command: '<Upload>', '<Set>' or '<ParticipantList>' fails with an error result.
+    participants: number of call participants (0: no active call).
+    page_limit: max participants per response, also when more are asked (None: no max)."""
+
+    def __init__(self, port=0, latency=0, upload_kbps=None, error_command=None, participants=0, page_limit=None):
+        self.latency = latency
+        self.upload_rate = upload_kbps * 1000 / 8 if upload_kbps else None
+        self.error_command = error_command
+        self.participants = participants
+        self.page_limit = page_limit
+        self.requests = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", port), FakeDeviceHandler)
+        self.server.daemon_threads = True
+        self.server.device = self
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*make_certificate())
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.address = f"127.0.0.1:{self.server.server_address[1]}"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Desk Pro xAPI server (HTTPS POST /putxml)")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--latency", type=float, default=0, help="ms per request")
+    parser.add_argument("--upload-kbps", type=float, default=None, help="max upload speed")
+    parser.add_argument("--error", choices=["upload", "set", "participants"], help="this command fails")
+    parser.add_argument("--participants", type=int, default=3, help="call participants (0: no call)")
+    parser.add_argument("--page-limit", type=int, default=None, help="max participants per response")
+    arguments = parser.parse_args()
+    error_command = {"upload": "<Upload>", "set": "<Set>", "participants": "<ParticipantList>"}.get(arguments.error)
+    device = FakeDevice(arguments.port, arguments.latency / 1000, arguments.upload_kbps, error_command, arguments.participants,
+                        arguments.page_limit)
+    print(f"fake device on {device.address} (endpoint_ip = {device.address}), Ctrl-C to stop")
+    try:
+        device.server.serve_forever()
+    except KeyboardInterrupt:
+        device.stop()
+
+
+if __name__ == "__main__":
+    main()
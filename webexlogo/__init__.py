@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# EMBED logo in virtual background image
+#    DJ Uittenbogaard (duittenb@cisco.com)
+#    more info: https://github.com/DJF3/Webex-Virtual-Background-Logo
+"""Webex Virtual Background Logo Insertion Script.
+Allows you to insert an image (like a logo) in a specific space on a
+virtual background of a Cisco Webex Desk Pro video device.
+Copyright (c) 2019 Cisco and/or its affiliates.
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+               https://developer.cisco.com/docs/licenses
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+
+Modules (import only what you need: Pillow and requests are only loaded
+by the modules that use them):
+  settings     Settings object (webexlogo_settings.ini)
+  device       DeviceClient: xAPI calls, uploads, slot switches
+  render       image functions: resize logo, add text, encode  (Pillow)
+  logos        find and download logos                         (requests)
+  domains      registrable domain of an email or subdomain (public suffixes)
+  backgrounds  create the background for a command, render cache
+  fleet, watch, prefetch, service, cli   command line modes
+"""
+myVersion = "0.4"
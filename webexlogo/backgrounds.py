@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""Create the background for a command: logo, text, clear or a new background
+image. Created backgrounds are kept in the render cache (my_logofolder/_rendercache),
+the decoded base image in my_logofolder/_basecache, drawn text in my_logofolder/_textcache.
+The logos module (requests) is only imported for commands that download images."""
+import copy
+import hashlib
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, PngImagePlugin
+from .common import WebexLogoError, check_files
+from . import trace
+from .render import encode_image, open_fitted, resizeLogo, logo_cells, paste_logo, text_layer, print_fontsize_note
+
+
+# ___ sha256 of a file's content. Remembered per file version (mtime + size)
+file_digests = dict()
+
+
+def file_digest(filename):
+    file_stat = os.stat(filename)
+    file_version = (filename, file_stat.st_mtime_ns, file_stat.st_size)
+    if file_version not in file_digests:
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        file_digests[file_version] = digest.hexdigest()
+    return file_digests[file_version]
+
+
+# ___ decoded base image: raw pixels in my_logofolder/_basecache, memory-mapped, so
+#     commands don't decode the base image. The file name has the base image's mtime and
+#     size: a changed base image gets a new raw file. The mapping is private (copy on
+#     write): a logo or text only copies the memory pages it changes, never the file.
+#     Pillow maps 1 and 4 byte/pixel modes: RGB is stored as RGBX. The base image is
+#     fitted to device_resolution; image.info["fit"] maps logo_start/logo_end onto it.
+base_images = dict()        # raw file (base image version + device_resolution) -> mode, size, fit
+raw_header_size = 128       # b"WEBEXLOGO RAW <mode> <width> <height> <fit>", padded with spaces
+
+
+def base_cache_file(settings, file_version):
+    my_inputfile, mtime_ns, file_size = file_version
+    name = hashlib.sha256(os.path.abspath(my_inputfile).encode("utf-8")).hexdigest()[:16]
+    target = "x".join(str(value) for value in settings.device_resolution) if settings.device_resolution else "original"
+    return settings.my_logofolder + f"/_basecache/{name}_{mtime_ns}_{file_size}_{target}.raw"
+
+
+# ___ decode the base image and save its pixels as raw file. Raw files of older versions of
+#     the same base image are removed (other device_resolutions of this version are kept).
+#     RETURNS: decoded image (mappable mode)
+def write_base_cache(settings, file_version, raw_file):
+    with trace.stage("decode base", file_bytes=file_version[2]) as span:
+        imBase, fit = open_fitted(settings.my_inputfile, settings.device_resolution)
+        if imBase.mode not in ["L", "RGBA", "RGBX"]:
+            imBase = imBase.convert("RGB").convert("RGBX")
+        imBase.info["fit"] = fit
+        span.add(size=f"{fit[3]}x{fit[4]} -> {imBase.width}x{imBase.height}")
+    with trace.stage("write base cache") as span:
+        cache_folder, raw_name = os.path.split(raw_file)
+        try:
+            os.makedirs(cache_folder, exist_ok=True)
+            header = f"WEBEXLOGO RAW {imBase.mode} {imBase.width} {imBase.height} {' '.join(str(value) for value in fit)}".encode("ascii")
+            tmp_file = temp_file(raw_file)
+            with open(tmp_file, 'wb') as f:
+                f.write(header.ljust(raw_header_size))
+                f.write(imBase.tobytes())
+            os.replace(tmp_file, raw_file)
+            span.add(raw_bytes=os.path.getsize(raw_file))
+            base_name, version_name = raw_name.split("_")[0] + "_", "_".join(raw_name.split("_")[:3]) + "_"
+            for entry in os.scandir(cache_folder):
+                # .tmp: another process is writing it (e.g. prefetch workers on a cold cache)
+                if entry.name.startswith(base_name) and not entry.name.startswith(version_name) and not entry.name.endswith(".tmp"):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:     # e.g. still mapped by another process (Windows)
+                        pass
+        except OSError as e:
+            print(f"     *NOTE* base image cache not updated: {e}")
+    return imBase
+
+
+# ___ RETURNS: mode, size, fit of a raw file. None: missing or incomplete
+def read_base_header(raw_file):
+    try:
+        with open(raw_file, 'rb') as f:
+            header = f.read(raw_header_size).decode("ascii", "replace").split()
+        mode, size = header[2], (int(header[3]), int(header[4]))
+        fit = (float(header[5]), int(header[6]), int(header[7]), int(header[8]), int(header[9]))
+        if header[:2] == ["WEBEXLOGO", "RAW"] and os.path.getsize(raw_file) == raw_header_size + size[0] * size[1] * len(mode):
+            return mode, size, fit
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+# ___ RETURNS: base image that can be changed (logo, text) without changing the cache
+def open_base_image(settings):
+    my_inputfile = settings.my_inputfile
+    file_stat = os.stat(my_inputfile)
+    file_version = (my_inputfile, file_stat.st_mtime_ns, file_stat.st_size)
+    raw_file = base_cache_file(settings, file_version)
+    if raw_file not in base_images:
+        raw_info = read_base_header(raw_file)
+        if raw_info is None:
+            return write_base_cache(settings, file_version, raw_file)   # just decoded: no copy needed
+        if len(base_images) >= 4:
+            base_images.clear()
+        base_images[raw_file] = raw_info
+    mode, size, fit = base_images[raw_file]
+    with trace.stage("map base"):
+        with open(raw_file, 'rb') as f:
+            raw_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        imBase = Image.frombuffer(mode, size, memoryview(raw_map)[raw_header_size:], "raw", mode, 0, 1)
+        imBase.readonly = 0     # private mapping: changes stay in this process
+        imBase.info["fit"] = fit
+    return imBase
+
+
+# ___ settings with the logo area (and font size) of the original base image mapped onto
+#     the fitted base image (image.info["fit"]). A part that was cropped off is left out.
+#     Logo area outside of the original base image: error
+def fitted_area(settings, imBackground):
+    scale, crop_x, crop_y, original_x, original_y = imBackground.info.get("fit", (1.0, 0, 0) + imBackground.size)
+    if settings.startX > original_x or settings.endX > original_x or settings.startY > original_y or settings.endY > original_y:
+        raise WebexLogoError(f"Start/End coordinates of logo must be within the base image.\n          Image resolution = {original_x}x{original_y}, logo start {settings.logo_start}, logo end {settings.logo_end}")
+    if (scale, crop_x, crop_y) == (1.0, 0, 0):
+        return settings
+    area = copy.copy(settings)
+    area.startX, area.endX = [min(max(round(x * scale) - crop_x, 0), imBackground.width) for x in (settings.startX, settings.endX)]
+    area.startY, area.endY = [min(max(round(y * scale) - crop_y, 0), imBackground.height) for y in (settings.startY, settings.endY)]
+    area.max_w = area.endX - area.startX
+    area.max_h = area.endY - area.startY
+    area.middle_x = int(area.startX + area.max_w/2)
+    area.middle_y = int(area.startY + area.max_h/2)
+    area.my_fontsize = max(round(settings.my_fontsize * scale), 1)
+    return area
+
+
+# ___ render cache: encoded backgrounds in my_logofolder/_rendercache, named by a digest
+#     of everything that changes the result. Least recently used files are removed first.
+def render_cache_key(render_parts):
+    return hashlib.sha256("\n".join(str(part) for part in render_parts).encode("utf-8")).hexdigest()
+
+
+def render_cache_file(settings, key):
+    return settings.my_logofolder + "/_rendercache/" + key
+
+
+def read_render_cache(settings, key):
+    if settings.render_cache_mb <= 0 or not check_files(render_cache_file(settings, key)):
+        return None
+    with open(render_cache_file(settings, key), 'rb') as f:
+        image_bytes = f.read()
+    os.utime(render_cache_file(settings, key))         # mark as recently used
+    return image_bytes
+
+
+def write_render_cache(settings, key, image_bytes):
+    if settings.render_cache_mb <= 0:
+        return
+    cache_folder = settings.my_logofolder + "/_rendercache"
+    cache_file = render_cache_file(settings, key)
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        tmp_file = temp_file(cache_file)
+        with open(tmp_file, 'wb') as f:
+            f.write(image_bytes)
+        os.replace(tmp_file, cache_file)
+        prune_cache_folder(cache_folder, settings.render_cache_mb * 1024 * 1024)
+    except OSError as e:
+        print(f"     *NOTE* render cache not updated: {e}")
+
+
+# ___ temp file to write a cache file: per process and thread, replaced by the cache file
+#     when it is complete. Other writers of the same file never touch it
+def temp_file(filename):
+    return f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+# ___ remove the least recently used files until the folder is not larger than max_bytes.
+#     Files that another process or thread removed in the meantime are skipped
+def prune_cache_folder(cache_folder, max_bytes):
+    cache_files = []
+    for entry in os.scandir(cache_folder):
+        try:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                entry_stat = entry.stat()
+                cache_files.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+    cache_size = sum(size for _, size, _ in cache_files)
+    for _, size, path in sorted(cache_files):       # oldest first
+        if cache_size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        cache_size -= size
+
+
+# ___ text layer cache: drawn text (RGBA PNG) in my_logofolder/_textcache, named by a digest
+#     of the text, font, font size, color and logo area size. Base images with the same
+#     logo area size use the same layer. The PNG has the layer's position and font size.
+#     Same max size as the render cache (render_cache_mb, 0: no cache)
+text_layers = dict()    # key -> (layer, offset_x, offset_y, font size) used by this process
+max_text_layers = 32
+
+
+def font_version(settings):
+    return file_digest(settings.my_fontfile) if check_files(settings.my_fontfile) else settings.my_fontfile
+
+
+# ___ RETURNS: text layer, offset_x, offset_y (from the middle of the logo area), font size
+def open_text_layer(settings, msg, area):
+    msg = msg.replace("##", "\n")
+    key = render_cache_key(["textlayer", msg, font_version(settings), area.my_fontsize, area.max_w, area.max_h, settings.my_fontcolor])
+    if key in text_layers:
+        return text_layers[key]
+    layer_file = settings.my_logofolder + "/_textcache/" + key + ".png"
+    text_info = None
+    if settings.render_cache_mb > 0 and check_files(layer_file):
+        try:
+            with trace.stage("text cache read"):
+                with Image.open(layer_file) as imLayer:
+                    imLayer.load()
+                    text_info = (imLayer.convert("RGBA"), int(imLayer.text["offset_x"]), int(imLayer.text["offset_y"]), int(imLayer.text["fontsize"]))
+            os.utime(layer_file)        # mark as recently used
+            print(f"     TEXT CACHE: using drawn text {key[:12]} (open_text_layer)")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"     *NOTE* text cache file not used: {e}")
+            text_info = None
+    if text_info is None:
+        with trace.stage("draw text"):
+            text_info = text_layer(msg, settings.my_fontfile, area.my_fontsize, area.max_w, area.max_h, settings.my_fontcolor)
+        if settings.render_cache_mb > 0:
+            write_text_layer(settings, layer_file, *text_info)
+    if len(text_layers) >= max_text_layers:
+        text_layers.clear()
+    text_layers[key] = text_info
+    return text_info
+
+
+def write_text_layer(settings, layer_file, imLayer, offset_x, offset_y, fontsize):
+    png_info = PngImagePlugin.PngInfo()
+    for name, value in (("offset_x", offset_x), ("offset_y", offset_y), ("fontsize", fontsize)):
+        png_info.add_text(name, str(value))
+    try:
+        with trace.stage("text cache write"):
+            os.makedirs(os.path.dirname(layer_file), exist_ok=True)
+            tmp_file = temp_file(layer_file)
+            imLayer.save(tmp_file, format="png", pnginfo=png_info, compress_level=1)
+            os.replace(tmp_file, layer_file)
+            prune_cache_folder(os.path.dirname(layer_file), settings.render_cache_mb * 1024 * 1024)
+    except OSError as e:
+        print(f"     *NOTE* text cache not updated: {e}")
+
+
+# ___ create the new background for a command. RETURNS: encoded image bytes, slot
+#     slot is "" when the command doesn't upload to a specific user1/2/3 slot.
+#     client (DeviceClient) is only used to read the participants (empty command)
+def render_background(settings, client, command):
+    new_slot = ""
+    my_text = ""
+    commandline_count = len(command.split(" "))
+    commandline_part1 = command.split(" ")[0]
+    if commandline_count == 2:
+        commandline_part2 = command.split(" ")[1]
+    elif commandline_count > 2:  # text with spaces -> combine
+        commandline_part2 = ' '.join(command.split(" ")[1:])
+    if command == "":
+        # --- Read participant list from device
+        print("2___ GOING TO READ PARTICIPANTS!  my_commandline is EMPTY ")
+        top_domains = client.read_allparticipants(settings.emaildomains, settings.max_logos)
+        new_logo, render_parts = get_logo_parts(settings, top_domains)
+    elif commandline_part1 == "clear":
+        # --- Clear logo from background
+        print("2___ Removing logo from background")
+        new_logo = settings.my_inputfile
+        render_parts = ["clear", file_digest(settings.my_inputfile)]
+    elif commandline_count > 1 and commandline_part1.lower() in ["user1", "user2", "user3"]:
+        # --- NEW virtual background to device
+        print("2___ Download new background - no logos")
+        image_destination = commandline_part1  # User1/2/3
+        image_location = commandline_part2     # Image
+        new_slot = image_destination
+        if len(image_location) > 45:
+            print(f"     Image (for '{image_destination}'):\n     {image_location}")
+        else:
+            print(f"     Image (for '{image_destination}'):   {image_location}")
+        from .logos import get_logo
+        new_logo = get_logo(settings, image_location, background=True)
+        render_parts = ["background", file_digest(new_logo)]
+    elif commandline_part1 == "text":
+        # --- ADD TEXT instead of logo
+        print("2___ Text: embedding text in background")
+        my_text = commandline_part2
+        new_logo = settings.my_inputfile
+        render_parts = ["text", file_digest(settings.my_inputfile), my_text, settings.logo_start, settings.logo_end,
+                        font_version(settings), settings.my_fontsize, settings.my_fontcolor]
+    else:  # --- Email, domain or URL. Several logos: comma separated emails/domains
+        print("2___ Preparing logo download")
+        if "," in command and not command.startswith("http"):
+            new_logo, render_parts = get_logo_parts(settings, [item.strip() for item in command.split(",") if item.strip() != ""])
+        else:
+            new_logo, render_parts = get_logo_parts(settings, [command])
+    render_parts += encode_render_parts(settings)
+    image_bytes, cache_hit = build_background(settings, render_parts, new_logo, my_text)
+    return image_bytes, new_slot
+
+
+# ___ logos for one or more emails/domains/URLs. Several logos are downloaded at the same
+#     time; one that can't be downloaded is left out. RETURNS: logo file (several: list
+#     of logo files), render_parts
+def get_logo_parts(settings, logo_commands):
+    from .logos import get_logo
+    if len(logo_commands) == 1:
+        new_logo = get_logo(settings, logo_commands[0])
+        return new_logo, logo_render_parts(settings, new_logo)
+
+    def download(logo_command):
+        try:
+            return get_logo(settings, logo_command)
+        except WebexLogoError as e:
+            print(f"     **ERROR** {logo_command}: {e}")
+            return None
+
+    print(f"     LOGOS: {', '.join(logo_commands)}")
+    with trace.stage("download logos", logos=len(logo_commands)), ThreadPoolExecutor(max_workers=len(logo_commands)) as pool:
+        new_logos = [new_logo for new_logo in pool.map(download, logo_commands) if new_logo is not None]
+    if len(new_logos) == 0:
+        raise WebexLogoError("none of the logos could be downloaded")
+    if len(new_logos) == 1:
+        return new_logos[0], logo_render_parts(settings, new_logos[0])
+    return new_logos, logo_render_parts(settings, new_logos)
+
+
+# ___ what the logo background depends on (render cache key parts, without encoding)
+#     new_logo: logo file, or a list of logo files ("logos": several logos in a grid)
+def logo_render_parts(settings, new_logo):
+    if isinstance(new_logo, list):
+        return ["logos", file_digest(settings.my_inputfile), [file_digest(logo_file) for logo_file in new_logo],
+                settings.logo_start, settings.logo_end, settings.scale_logo, settings.logo_resample]
+    return ["logo", file_digest(settings.my_inputfile), file_digest(new_logo), settings.logo_start, settings.logo_end,
+            settings.scale_logo, settings.logo_resample]
+
+
+# ___ encoding settings and device resolution (last render cache key parts)
+def encode_render_parts(settings):
+    return ["jpeg", settings.jpeg_quality, settings.upload_max_kb, settings.jpeg_min_psnr, settings.device_resolution]
+
+
+# ___ create the encoded background, or take it from the render cache.
+#     save_result: also save it as _result.jpg. RETURNS: image bytes, True if from cache
+def build_background(settings, render_parts, new_logo, my_text="", save_result=True):
+    render_key = render_cache_key(render_parts)
+    with trace.stage("render cache read") as span:
+        image_bytes = read_render_cache(settings, render_key)
+        span.add(hit=image_bytes is not None)
+    if image_bytes is not None:
+        print(f"     RENDER CACHE: using created background {render_key[:12]} (build_background)")
+        if save_result:
+            save_result_file(settings, image_bytes)
+        return image_bytes, True
+
+    if render_parts[0] in ["logo", "logos"]:
+        new_logos = new_logo if render_parts[0] == "logos" else [new_logo]
+        imBackground = open_base_image(settings)
+        area = fitted_area(settings, imBackground)
+        with trace.stage("decode logo", logos=len(new_logos)):
+            imLogos = [Image.open(logo_file) for logo_file in new_logos]
+            for imLogo in imLogos:
+                imLogo.load()
+        if len(imLogos) == 1:
+            cells = [(area.max_w, area.max_h, area.middle_x, area.middle_y)]
+        else:   # one decode/encode for all logos: each in its own cell of the logo area
+            cells = logo_cells([imLogo.size for imLogo in imLogos], area.startX, area.startY, area.max_w, area.max_h)
+        with trace.stage("resize", size=", ".join(f"{imLogo.width}x{imLogo.height}" for imLogo in imLogos)):
+            placed_logos = []
+            for imLogo, (cell_w, cell_h, middle_x, middle_y) in zip(imLogos, cells):
+                # several logos: a logo that is too big for its cell is always scaled down
+                scale_logo = settings.scale_logo or (len(imLogos) > 1 and (imLogo.width > cell_w or imLogo.height > cell_h))
+                placed_logos.append(resizeLogo(imLogo, cell_w, cell_h, scale_logo, middle_x, middle_y, settings.logo_resample))
+        with trace.stage("paste", logos=len(placed_logos)):
+            for imLogo, newstart_x, newstart_y in placed_logos:
+                paste_logo(imBackground, imLogo, newstart_x, newstart_y)   # X,Y - from top-left corner
+    elif render_parts[0] == "text":
+        imBackground = open_base_image(settings)
+        area = fitted_area(settings, imBackground)
+        with trace.stage("text"):   # drawn once, later only pasted (text layer cache)
+            imText, offset_x, offset_y, fitted_fontsize = open_text_layer(settings, my_text, area)
+            print_fontsize_note(fitted_fontsize, area.my_fontsize)
+            paste_logo(imBackground, imText, area.middle_x + offset_x, area.middle_y + offset_y)
+    elif render_parts[0] == "clear":
+        imBackground = open_base_image(settings)
+    else:  # --- new background
+        with trace.stage("decode background") as span:
+            imBackground, fit = open_fitted(new_logo, settings.device_resolution)
+            span.add(size=f"{fit[3]}x{fit[4]} -> {imBackground.width}x{imBackground.height}")
+    with trace.stage("encode") as span:
+        start_time = time.perf_counter()
+        image_bytes, encode_info = encode_image(imBackground, settings.jpeg_quality, settings.upload_max_kb * 1024, settings.jpeg_min_psnr)
+        encode_time = time.perf_counter() - start_time
+        span.add(image_bytes=len(image_bytes), **encode_info)
+    psnr = f", {encode_info['psnr']} dB" if "psnr" in encode_info else ""
+    print(f"     ENCODE: jpeg quality {encode_info['quality']} ({encode_info['subsampling']}{psnr}), "
+          f"{len(image_bytes)/1024:.0f} kB in {encode_time*1000:.0f} ms (build_background)")
+    if settings.upload_max_kb > 0 and len(image_bytes) > settings.upload_max_kb * 1024:
+        print(f"     *NOTE* background is larger than upload_max_kb ({settings.upload_max_kb} kB) at the lowest JPEG quality")
+    elif settings.jpeg_min_psnr > 0 and encode_info["psnr"] < settings.jpeg_min_psnr:
+        if encode_info["quality"] < settings.jpeg_quality:
+            print(f"     *NOTE* quality lowered below jpeg_min_psnr ({settings.jpeg_min_psnr:g} dB) to fit upload_max_kb")
+        else:
+            print(f"     *NOTE* jpeg_min_psnr ({settings.jpeg_min_psnr:g} dB) not reached at jpeg_quality {settings.jpeg_quality}")
+    with trace.stage("render cache write"):
+        write_render_cache(settings, render_key, image_bytes)
+    # SAVE result
+    if save_result:
+        save_result_file(settings, image_bytes)
+    return image_bytes, False
+
+
+# ___ save the uploaded background as _result.jpg (to see what the device shows)
+def save_result_file(settings, image_bytes):
+    with trace.stage("save result"):
+        with open(settings.my_logofolder + "/_result.jpg", 'wb') as f:
+            f.write(image_bytes)
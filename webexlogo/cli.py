@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Command line: python -m webexlogo COMMAND (or python webexlogo.py COMMAND).
+Modules are imported per command: a user1/2/3 switch doesn't load Pillow or requests."""
+import os
+import sys
+from . import myVersion
+from .common import beep, check_files, WebexLogoError
+from .settings import Settings
+from .device import DeviceClient
+from . import trace
+
+
+def help_text(settings):
+    help_text = """
+ Webex Virtual Background logo insertion \n
+____________________________________DJ Uittenbogaard_(""" + myVersion + """)__
+
+Options: (replace uppercase text)
+  DOMAIN/EMAIL           - add logo to background in userX
+  FILE_NAME/URL          - add logo to background in userX
+  clear                  - remove logo
+  user1/2/3              - switch to background user1/2/3
+  user1/2/3 FILE_NAME/URL - upload background to user1/2/3
+  text YOUR_TEXT         - add text to background in userX
+  text TEXT##ON##NEWLINE - add multiline text to background
+  watch                  - keep adding the logo of the active call to userX
+  fleet COMMAND          - run COMMAND on all devices in the fleet_inventory
+  prefetch FILE          - download logos + create backgrounds for a list
+                           of emails/domains/URLs (csv or text, '-': stdin)
+  serve [PORT]           - run a local HTTP job service (POST /jobs)
+  --force                - upload even if the device already has the background
+  --timing               - show the time per stage (download, render, upload)
+  --trace FILE           - save the time per stage: FILE.json = Chrome trace,
+                           other names: JSON lines (also shows --timing)
+  --profile FILE         - save a cProfile of the run, show the top functions
+_______________________________________________________________\n\n"""
+    help_text = help_text.replace("userX",settings.my_user_image_location)
+    print(help_text)
+    exit()
+
+
+# ___ remove the trace options from the arguments. RETURNS: arguments, trace.start() options
+def trace_options(argv):
+    arguments, options = [], {}
+    argv = list(argv)
+    while argv:
+        argument = argv.pop(0)
+        if argument == "--timing":
+            options["timing"] = True
+        elif argument in ["--trace", "--profile"]:
+            if not argv:
+                print(f"\n**ERROR** {argument} needs a file name\n")
+                beep(3)
+                exit()
+            options[argument[2:] + "_file"] = argv.pop(0)
+        else:
+            arguments.append(argument)
+    return arguments, options
+
+
+# ___ if the font file doesn't exist, use the default font (Arial)
+def check_fontfile(settings):
+    if not check_files(settings.my_fontfile):
+        if settings.my_fontfile == "":
+            print(f"     *NOTE* font file not configured, using Arial.ttf")
+        else:
+            print(f"     *NOTE* font file '{settings.my_fontfile}' cannot be found, using {settings.my_fontfile}")
+        if os.name == 'nt':
+            settings.my_fontfile = "arial.ttf"
+        else:
+            settings.my_fontfile = "Arial.ttf"
+
+
+# ---------------------------------------------------------------------------------
+#      _____ _______       _____ _______
+#     / ____|__   __|/\   |  __ \__   __|
+#    | (___    | |  /  \  | |__) | | |
+#     \___ \   | | / /\ \ |  _  /  | |
+#     ____) |  | |/ ____ \| | \ \  | |
+#    |_____/   |_/_/    \_\_|  \_\ |_| http://www.network-science.de/ascii/ 'big'
+#
+# ---------------------------------------------------------------------------------
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    argv, options = trace_options(argv)
+    trace.start(**options)
+    try:
+        run(argv)
+    finally:
+        trace.finish()
+
+
+# ___ run a command. Errors of the webexlogo modules (WebexLogoError) are printed here: beep + stop
+def run(argv):
+    try:
+        run_command(argv)
+    except WebexLogoError as e:
+        print(f"\n*NOTE* {e}\n" if e.note else f"\n**ERROR** {e}\n")
+        beep(3)
+        exit()
+
+
+def run_command(argv):
+    with trace.stage("settings"):
+        settings = Settings.load()
+    # _______1____ READ COMMAND LINE
+    force = "--force" in argv      # --force: upload even if the device has it
+    arguments = [argument for argument in argv if argument != "--force"]
+    if len(arguments) > 0:
+        my_commandline = ' '.join(arguments)
+        if my_commandline.split(" ")[0].lower() in ["help"]:
+            help_text(settings)
+        else:
+            print("\n\n________________________________________(" + myVersion + ")___")
+        if len(my_commandline) > 45:
+            print(f"1___ Argument:\n     {my_commandline}")
+        else:
+            print(f"1___ Argument: {my_commandline}")
+    else:
+        my_commandline = ""
+    fleet_mode = my_commandline.split(" ")[0].lower() == "fleet"
+    if fleet_mode:     # --- same command, for all devices in the fleet inventory
+        my_commandline = ' '.join(my_commandline.split(" ")[1:])
+    if not check_files(settings.my_inputfile):
+        print(f"\n**ERROR** background image file '{settings.my_inputfile}' cannot be found\n")
+        beep(3)
+        exit()
+    if my_commandline.split(" ")[0] in ["text", "serve"]:
+        check_fontfile(settings)
+    if not check_files(settings.my_logofolder):
+        try:
+            os.mkdir(settings.my_logofolder)
+            print(f"     **NOTE: imagecache folder '{settings.my_logofolder}' does not exist. Creating it.")
+        except Exception as e:
+            print(f"\n**ERROR** creating imagecache folder: \nError message:\n{e}\n")
+            beep(3)
+            exit()
+    client = DeviceClient.from_settings(settings)
+
+    # _______2____ PROCESS COMMAND LINE
+    if my_commandline == "watch" and not fleet_mode:
+        from .watch import run_watch
+        run_watch(settings, client, force)
+        return
+    if my_commandline.split(" ")[0] == "prefetch" and not fleet_mode:
+        from .prefetch import run_prefetch
+        run_prefetch(settings, ' '.join(my_commandline.split(" ")[1:]) or "-")
+        print("____ finished ___________________________________\n")
+        beep(1)
+        return
+    if my_commandline.split(" ")[0] == "serve" and not fleet_mode:
+        port = my_commandline.split(" ")[1] if len(my_commandline.split(" ")) > 1 else ""
+        if port != "" and not port.isdigit():
+            print(f"\n**ERROR** serve: '{port}' is not a port number\n")
+            beep(3)
+            exit()
+        from .service import run_service
+        run_service(settings, int(port) if port else None, force)
+        return
+    if fleet_mode:
+        from .fleet import run_fleet
+        run_fleet(settings, my_commandline, force)
+        print("____ finished ___________________________________\n")
+        beep(1)
+        return
+    commandline_count = len(my_commandline.split(" "))
+    commandline_part1 = my_commandline.split(" ")[0]
+    my_user_image_location = settings.my_user_image_location
+    if commandline_count == 1 and commandline_part1.lower() in ["user1", "user2", "user3"]:
+        # --- SWITCH to user1/2/3
+        my_user_image_location = commandline_part1
+        print(f"2___ Switching to {my_user_image_location}\n\n\n")
+        xapiresult = client.switch_background(my_user_image_location)
+        if "**ERROR**" in xapiresult:
+            print(f"\n**ERROR** Can't switch to new background\n{xapiresult}\n")
+        beep(1)
+        return
+    from .backgrounds import render_background
+    with trace.stage("render background"):
+        image_bytes, new_slot = render_background(settings, client, my_commandline)
+    if new_slot != "":
+        my_user_image_location = new_slot
+
+    # _______3____ PREPARE BACKGROUND FOR UPLOAD
+    print("3___ PREPARE background upload")
+    client.push_background(image_bytes, my_user_image_location, force=force)
+    print(f"     {client.timing_summary()}")
+
+    print("____ finished ___________________________________\n")
+    beep(1)
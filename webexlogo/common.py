@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Small helpers used by all webexlogo modules."""
+import json
+import os
+
+
+# ___ error of a webexlogo function: in your own scripts catch it, the command line prints
+#     it and stops. note=True: not really an error (e.g. no active call)
+class WebexLogoError(Exception):
+    def __init__(self, message, note=False):
+        super().__init__(message)
+        self.note = note
+
+
+# ___ Beep x times
+def beep(number):
+    for _ in range(number):
+        print("\a", end="", flush=True)
+    return
+
+
+# ___ check if a file exists
+def check_files(filename):
+    try:
+        filesize = os.path.getsize(str(filename))
+        return True
+    except:
+        return False
+
+
+# ___ read a json state file (manifest, metadata). RETURNS: dict, empty if missing/invalid
+def read_json_file(filename):
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+# ___ write a json state file: write a temp file, then replace (never half a file)
+def write_json_file(filename, data):
+    try:
+        with open(filename + ".tmp", 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(filename + ".tmp", filename)
+    except OSError as e:
+        print(f"     *NOTE* {os.path.basename(filename)} not saved: {e}")
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""Video device (xAPI) client: pooled keep-alive HTTPS connections, streamed
+background uploads, slot switches and the call participant list."""
+import atexit
+import base64
+import hashlib
+import http.client
+import ssl
+import threading
+import time
+from collections import Counter
+from .common import WebexLogoError, read_json_file, write_json_file
+from .domains import registrable_domain
+from . import trace
+
+participant_page_size = 500    # participants per ParticipantList request
+
+
+# ___ ParticipantList search for one page of participants (offset: first participant)
+def participant_payload(offset=0, limit=participant_page_size):
+    return (f"<Command><Conference><ParticipantList><Search><Offset>{offset}</Offset><Limit>{limit}</Limit>"
+            f"</Search></ParticipantList></Conference></Command>")
+
+
+# ___ http headers for xAPI calls to a device with this token
+def xapi_headers(token):
+    return {
+      'Authorization': 'Basic ' + token,
+      'Content-Type': 'text/xml'
+    }
+
+
+# ___ xAPI connection pool: keep-alive HTTPS connections per device, reused by xapiCall
+xapi_pool = dict()          # endpointip -> idle connections
+xapi_stats = dict()         # endpointip -> connection and request timing
+xapi_pool_lock = threading.Lock()
+xapi_ssl_context = ssl._create_unverified_context()
+
+
+# ___ open a new connection to a device (TCP + TLS handshake happen here)
+def xapi_connect(endpointip):
+    conn = http.client.HTTPSConnection(endpointip, context = xapi_ssl_context, timeout=20)
+    start_time = time.perf_counter()
+    with trace.stage("connect", endpoint=endpointip):
+        conn.connect()
+    xapi_add_stats(endpointip, connects=1, handshake_time=time.perf_counter() - start_time)
+    return conn
+
+
+# ___ add connection/request counters and timing for a device
+def xapi_add_stats(endpointip, **values):
+    with xapi_pool_lock:
+        stats = xapi_stats.setdefault(endpointip, {"connects": 0, "handshake_time": 0.0, "requests": 0, "request_time": 0.0, "reconnects": 0, "bytes_sent": 0})
+        for key, value in values.items():
+            stats[key] += value
+
+
+# ___ close pooled connections of one device (or all devices)
+def xapi_close_connections(endpointip=None):
+    with xapi_pool_lock:
+        endpoints = [endpointip] if endpointip is not None else list(xapi_pool)
+        connections = []
+        for endpoint in endpoints:
+            connections += xapi_pool.pop(endpoint, [])
+    for conn in connections:
+        conn.close()
+
+
+atexit.register(xapi_close_connections)
+
+
+# ___ one line with connection and request timing for a device
+def xapi_timing_summary(endpointip):
+    stats = xapi_stats.get(endpointip)
+    if stats is None:
+        return f"xAPI {endpointip}: no requests"
+    return (f"xAPI {endpointip}: {stats['requests']} requests on {stats['connects']} connection(s), "
+            f"handshake {stats['handshake_time']*1000:.0f}ms, requests {stats['request_time']*1000:.0f}ms, "
+            f"sent {stats['bytes_sent']/1024:.0f} kB")
+
+
+# ___ xAPI upload command with the base64 image as body, created while it is sent.
+#     Only the encoded image is kept in memory: base64 is made per chunk during the upload.
+class UploadBody:
+    chunk_size = 3 * 64 * 1024      # multiple of 3: base64 chunks can be joined
+
+    def __init__(self, slot, image_bytes):
+        self.head = ("<Command><Cameras><Background><Upload><Image>" + slot + "</Image><body>").encode("utf-8")
+        self.tail = "</body></Upload></Background></Cameras></Command>".encode("utf-8")
+        self.image_bytes = image_bytes
+        self.base64_time = 0.0      # time spent in base64 during the last upload
+
+    def __len__(self):      # known length: sent as Content-Length, not chunked
+        return len(self.head) + 4 * ((len(self.image_bytes) + 2) // 3) + len(self.tail)
+
+    def __iter__(self):     # new iterator per call: a retried upload starts again
+        yield self.head
+        self.base64_time = 0.0
+        image_view = memoryview(self.image_bytes)
+        for position in range(0, len(image_view), self.chunk_size):
+            start_time = time.perf_counter()
+            chunk = base64.b64encode(image_view[position:position + self.chunk_size])
+            self.base64_time += time.perf_counter() - start_time
+            yield chunk
+        yield self.tail
+
+
+# ___ send (x)API call to video device
+#     raise_on_error=True: raise connection errors as WebexLogoError
+#     raise_on_error=False: return them as '**ERROR**' text (fleet mode, watch)
+def xapiCall(headers,payload,endpointip,raise_on_error=True):
+    command_name = "upload" if isinstance(payload, UploadBody) else "participants" if "ParticipantList" in payload else "command"
+    with trace.stage("xapi " + command_name, endpoint=endpointip, payload_bytes=len(payload)):
+        if isinstance(payload, UploadBody):     # streamed body: send its length up front
+            headers = dict(headers)
+            headers['Content-Length'] = str(len(payload))
+        for attempt in range(2):
+            with xapi_pool_lock:    # retry: always a new connection, never one other threads returned
+                idle = xapi_pool.get(endpointip, [])
+                conn = idle.pop() if idle and attempt == 0 else None
+            reused = conn is not None
+            try:
+                if conn is None:
+                    conn = xapi_connect(endpointip)
+                start_time = time.perf_counter()
+                conn.request("POST", "/putxml", payload, headers)
+                res = conn.getresponse()
+                response_body = res.read()      # read it all: connection can be reused
+                trace.add(response_bytes=len(response_body), status=res.status)
+                if isinstance(payload, UploadBody):
+                    trace.add(base64_ms=round(payload.base64_time * 1000, 3))
+                xapi_add_stats(endpointip, requests=1, request_time=time.perf_counter() - start_time, bytes_sent=len(payload))
+                break
+            except (ConnectionError, ssl.SSLEOFError) as e:
+                if conn is not None:
+                    conn.close()
+                if reused:      # device closed idle connection(s): reconnect and retry
+                    xapi_close_connections(endpointip)
+                    xapi_add_stats(endpointip, reconnects=1)
+                    continue
+                error = e
+            except Exception as e:
+                if conn is not None:
+                    conn.close()
+                error = e
+            if not raise_on_error:
+                return f"**ERROR** connecting to video device ({endpointip}): {error}"
+            raise WebexLogoError(f"connecting to video device ({endpointip}).\n          Message: {error}")
+        if res.will_close:
+            conn.close()
+        else:
+            with xapi_pool_lock:
+                xapi_pool.setdefault(endpointip, []).append(conn)
+        if res.status == 200:
+            data = response_body.decode("utf-8")
+            if 'status="error"' in data.lower():     # not "error" anywhere: could be in a participant name
+                data = "**ERROR** xapiCall: " + data.split("status=")[1].split("/>")[0]
+                #print(f"\n**ERROR**: {data}")
+        else:
+            data = "**ERROR** xapiCall: status: " + str(res.status) + "  -- reason: " + str(res.reason)
+        return data
+
+
+# ___ slot manifest (my_logofolder/_slot_manifest.json): per device, the digest of the
+#     background last uploaded to each user1/2/3 slot and the slot that was made active
+slot_manifests = dict()     # manifest file -> manifest
+slot_manifest_lock = threading.Lock()
+
+
+def load_slot_manifest(manifest_file):      # call with slot_manifest_lock
+    if manifest_file not in slot_manifests:
+        slot_manifests[manifest_file] = read_json_file(manifest_file)
+    return slot_manifests[manifest_file]
+
+
+def read_slot_manifest(manifest_file, endpointip):
+    with slot_manifest_lock:
+        return dict(load_slot_manifest(manifest_file).get(endpointip, {}))
+
+
+# ___ remember a slot digest (or "active" slot) for a device. value None: forget it
+def update_slot_manifest(manifest_file, endpointip, key, value):
+    with slot_manifest_lock:
+        device_manifest = load_slot_manifest(manifest_file).setdefault(endpointip, {})
+        if value is None:
+            device_manifest.pop(key, None)
+        else:
+            device_manifest[key] = value
+        write_json_file(manifest_file, slot_manifests[manifest_file])
+
+
+class DeviceClient:
+    """One video device: xAPI calls (pooled connections), background uploads and
+    slot switches. Uploads and switches are recorded in the slot manifest."""
+
+    def __init__(self, endpoint_ip, token, manifest_file="_slot_manifest.json", public_suffix_file=""):
+        self.endpoint_ip = endpoint_ip
+        self.headers = xapi_headers(token)
+        self.manifest_file = manifest_file
+        self.public_suffix_file = public_suffix_file    # participant domains: see domains.py
+
+    @classmethod
+    def from_settings(cls, settings, endpoint_ip=None, token=None):
+        return cls(endpoint_ip or settings.endpoint_ip, token or settings.my_token_xapi,
+                   settings.my_logofolder + "/_slot_manifest.json", settings.public_suffix_file)
+
+    def xapiCall(self, payload, raise_on_error=True):
+        return xapiCall(self.headers, payload, self.endpoint_ip, raise_on_error)
+
+    def timing_summary(self):
+        return xapi_timing_summary(self.endpoint_ip)
+
+    def close(self):
+        xapi_close_connections(self.endpoint_ip)
+
+    # ___ switch device to a user1/2/3 background. RETURNS: xapi result
+    def switch_background(self, slot, raise_on_error=True):
+        payl_switchbg = "<Command><Cameras><Background><Set><Image>" + slot + "</Image><Mode>Image</Mode></Set></Background></Cameras></Command>"
+        with trace.stage("switch", slot=slot):
+            xapiresult = self.xapiCall(payl_switchbg, raise_on_error)
+        if "**ERROR**" in xapiresult:
+            update_slot_manifest(self.manifest_file, self.endpoint_ip, "active", None)
+        else:
+            update_slot_manifest(self.manifest_file, self.endpoint_ip, "active", slot.capitalize())
+        return xapiresult
+
+    # ___ upload background to a device slot and make it visible. RETURNS: list of errors
+    #     Skips the upload when the slot already has this background (slot manifest) and
+    #     only switches when needed. force=True: always upload, blur and switch.
+    #     fleet=True: no progress output, stop at the first error instead of WebexLogoError
+    def push_background(self, image_bytes, slot, fleet=False, force=False):
+        errors = []
+        endpointip = self.endpoint_ip
+        slot_key = slot.capitalize()
+        device_manifest = read_slot_manifest(self.manifest_file, endpointip)
+        active_slot = device_manifest.get("active")     # None: unknown
+        image_digest = hashlib.sha256(image_bytes).hexdigest()
+
+        # _______4____ UPLOAD BACKGROUND
+        uploaded = force or device_manifest.get(slot_key) != image_digest
+        if not uploaded:
+            if not fleet:
+                print(f"4___ SKIP upload: {slot} on {endpointip} already has this background (use --force to upload)")
+        else:
+            if not fleet:
+                print("4___ UPLOADING background to video device @ " + endpointip + ")")
+            payload = UploadBody(slot, image_bytes)
+            with trace.stage("upload", slot=slot, image_bytes=len(image_bytes)):
+                xapiresult = self.xapiCall(payload, not fleet)
+            if "**ERROR**" in xapiresult:
+                update_slot_manifest(self.manifest_file, endpointip, slot_key, None)
+                errors.append(f"Can't add new background: {xapiresult}")
+                if fleet:
+                    return errors
+                print(f"\n**ERROR** Can't add new background:\n {xapiresult}\n")
+            else:
+                update_slot_manifest(self.manifest_file, endpointip, slot_key, image_digest)
+
+        # _______5a____ SWITCH TO BLUR: needed to show a new upload in the active slot
+        if not uploaded and active_slot == slot_key:
+            if not fleet:
+                print(f"5___ {slot} is already the active background")
+            return errors
+        if force or (uploaded and active_slot in [None, slot_key]):    # force: manifest may be out of date
+            if not fleet:
+                print(f"5___ Switch to Blur and then back to {slot} to make changes visible.")
+            payl_switchbg = "<Command><Cameras><Background><Set><Mode>BlurMonochrome</Mode></Set></Background></Cameras></Command>"
+            with trace.stage("blur"):
+                xapiresult = self.xapiCall(payl_switchbg, not fleet)
+            if "**ERROR**" in xapiresult:
+                errors.append(f"Can't switch to blur: {xapiresult}")
+                if fleet:
+                    return errors
+                print(f"\n**ERROR** Can't switch to blur:\n {xapiresult}\n")
+        elif not fleet:
+            print(f"5___ Switch to {slot}")
+
+        # _______5b____ SWITCH TO NEW BACKGROUND
+        xapiresult = self.switch_background(slot, not fleet)
+        if "**ERROR**" in xapiresult:
+            errors.append(f"Can't switch to new background: {xapiresult}")
+            if not fleet:
+                print(f"\n**ERROR** Can't switch to new background\n{xapiresult}\n")
+        return errors
+
+    # ___ read email addresses from an active call. RETURNS: list of the 'count' most
+    #     common domains, most participants first
+    def read_allparticipants(self, emaildomains, count=1, quiet=True):
+        domain_counts, participants, error = self.count_call_domains(emaildomains, quiet=quiet)
+        if "not found" in error:
+            raise WebexLogoError("No active call", note=True)
+        if error:
+            raise WebexLogoError(f"Getting participant details.\n           Message: {error}")
+        if len(domain_counts) == 0:
+            raise WebexLogoError("read_allparticipants: no external users found. - stopping")
+        print(f"     PARTICIPANTS: {participants}, external domains: "
+              + ", ".join(f"{domain} ({domain_count})" for domain, domain_count in domain_counts.most_common(5))
+              + (f" and {len(domain_counts) - 5} more" if len(domain_counts) > 5 else ""))
+        return top_domains(domain_counts, count)
+
+    # ___ count the external domains of all participants of the active call, asking for
+    #     participant_page_size participants per request. RETURNS: Counter {domain: count},
+    #     number of participants, error ("": ok, else xapi result, e.g. 'Call not found')
+    def count_call_domains(self, emaildomains, raise_on_error=True, quiet=True):
+        domain_counts = Counter()
+        participants = 0
+        while True:
+            participant_xml = self.xapiCall(participant_payload(participants), raise_on_error)
+            if "**ERROR**" in participant_xml:
+                return domain_counts, participants, participant_xml
+            with trace.stage("count domains", response_bytes=len(participant_xml)) as span:
+                page_participants, total_participants = count_participant_page(participant_xml, emaildomains, domain_counts, quiet,
+                                                                                   self.public_suffix_file)
+                span.add(participants=page_participants)
+            participants += page_participants
+            # last page: all of the total the device reported (a device can return fewer
+            # than asked per page), an empty page, or without a total: fewer than asked
+            if total_participants is not None:
+                if participants >= total_participants or page_participants == 0:
+                    return domain_counts, participants, ""
+            elif page_participants < participant_page_size:
+                return domain_counts, participants, ""
+
+
+# ___ the 'count' domains with the most participants, most first (same count: first seen)
+def top_domains(domain_counts, count=1):
+    return [domain for domain, domain_count in Counter(domain_counts).most_common(count)]
+
+
+# ___ count the external participant domains of one ParticipantList response (adds to
+#     domain_counts). Streamed: each participant is dropped once it is counted.
+#     Counted per registrable domain: 'eu.acme.com' and 'acme.com' are one customer.
+#     emaildomains: ignored domains (a set, also works with a list).
+#     RETURNS: participants in this response, total participants (None: not in response)
+def count_participant_page(participant_xml, emaildomains, domain_counts, quiet=True, suffix_file=""):
+    import xml.etree.ElementTree as ET
+    parser = ET.XMLPullParser(events=("end",))
+    participants, total_participants = 0, None
+    for chunk_start in range(0, len(participant_xml), 64 * 1024):
+        parser.feed(participant_xml[chunk_start:chunk_start + 64 * 1024])
+        for event, elem in parser.read_events():
+            if elem.tag == "Email":
+                userEmail = elem.text
+                if userEmail is None or "@" not in userEmail:
+                    if not quiet:
+                        print("     -- user email: no email found. Is this a Webex meeting?")
+                    continue
+                userDomain = userEmail.rsplit("@", 1)[1].lower()
+                customerDomain = registrable_domain(userDomain, suffix_file)
+                if not quiet:
+                    print(f"     -- user email: {userEmail} ---- domain: {customerDomain}")
+                if userDomain not in emaildomains and customerDomain not in emaildomains:
+                    domain_counts[customerDomain] += 1
+            elif elem.tag == "Participant":
+                participants += 1
+                elem.clear()
+            elif elem.tag == "TotalRows" and (elem.text or "").isdigit():
+                total_participants = int(elem.text)
+    parser.close()
+    return participants, total_participants
+
+
+# ___ count external participant domains in a ParticipantList response. RETURNS: Counter {domain: count}
+def count_participant_domains(participant_xml, emaildomains, quiet=True, suffix_file=""):
+    domain_counts = Counter()
+    count_participant_page(participant_xml, emaildomains, domain_counts, quiet, suffix_file)
+    return domain_counts
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Domain names: the registrable domain ('eu.acme.co.uk' -> 'acme.co.uk'), so all
+addresses of one customer use the same logo. Offline: a built-in list of public
+suffixes with more than one part, or a copy of the full list
+(https://publicsuffix.org/list/public_suffix_list.dat) in public_suffix_file."""
+import functools
+
+# ___ public suffixes with more than one part (top level domains like .com, .nl are
+#     always a suffix). Only the most used ones: set public_suffix_file for all
+builtin_suffixes = """
+    co.uk org.uk me.uk ltd.uk plc.uk ac.uk gov.uk nhs.uk
+    com.au net.au org.au edu.au gov.au co.nz org.nz net.nz govt.nz ac.nz
+    co.jp ne.jp or.jp ac.jp go.jp co.kr or.kr ac.kr go.kr
+    com.cn net.cn org.cn gov.cn edu.cn com.hk org.hk edu.hk com.tw org.tw edu.tw
+    com.sg edu.sg gov.sg com.my edu.my com.ph com.vn co.th ac.th go.th co.id ac.id go.id
+    co.in net.in org.in ac.in gov.in com.pk edu.pk
+    co.za org.za ac.za gov.za com.eg com.ng co.ke
+    co.il ac.il org.il com.sa com.tr org.tr edu.tr gov.tr com.ua
+    com.br net.br org.br gov.br edu.br com.mx org.mx gob.mx com.ar gob.ar
+    com.co com.pe com.ve com.ec com.uy com.cl
+    co.at or.at ac.at com.pl net.pl org.pl com.es org.es com.pt com.gr com.cy com.mt
+    github.io gitlab.io herokuapp.com azurewebsites.net cloudfront.net blogspot.com
+    """.split()
+
+
+# ___ read the public suffix rules: built-in + public_suffix_file (publicsuffix.org
+#     format: '//' comments, '*.' wildcard rules, '!' exceptions). Cached per file.
+#     RETURNS: rules, wildcard rules (without '*.'), exceptions (without '!')
+@functools.lru_cache(maxsize=8)
+def load_suffixes(suffix_file=""):
+    rules, wildcards, exceptions = set(builtin_suffixes), set(), set()
+    if suffix_file:
+        try:
+            with open(suffix_file, encoding="utf-8") as f:
+                for line in f:
+                    rule = line.strip().split(" ")[0].lower()
+                    if rule == "" or rule.startswith("//"):
+                        continue
+                    if rule.startswith("!"):
+                        exceptions.add(rule[1:])
+                    elif rule.startswith("*."):
+                        wildcards.add(rule[2:])
+                    else:
+                        rules.add(rule)
+        except OSError as e:
+            print(f"     *NOTE* public_suffix_file not used (only the built-in list): {e}")
+    return frozenset(rules), frozenset(wildcards), frozenset(exceptions)
+
+
+# ___ registrable domain: the public suffix + one part. Lowercase, without 'www.' and
+#     without the part before '@'. 'user@EU.Acme.com' -> 'acme.com'.
+#     A domain that is itself a public suffix is returned as is.
+@functools.lru_cache(maxsize=4096)
+def registrable_domain(domain, suffix_file=""):
+    domain = domain.rsplit("@", 1)[-1].strip().strip(".").lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    rules, wildcards, exceptions = load_suffixes(suffix_file)
+    labels = domain.split(".")
+    suffix_start = len(labels) - 1         # default rule: the top level domain
+    for index in range(len(labels)):       # first match from the left: longest suffix
+        candidate = ".".join(labels[index:])
+        if candidate in exceptions:
+            suffix_start = index + 1
+            break
+        if candidate in rules or ".".join(labels[index + 1:]) in wildcards:
+            suffix_start = index
+            break
+    if suffix_start == 0:
+        return domain
+    return ".".join(labels[suffix_start - 1:])
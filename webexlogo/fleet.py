@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Fleet mode: run one command on all devices in the fleet inventory."""
+import configparser
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .common import WebexLogoError, check_files
+from .device import DeviceClient
+from .backgrounds import render_background
+from . import trace
+
+
+# ___ read fleet device list (.ini file, one section per device). RETURNS: list of devices
+def read_inventory(settings, filename):
+    if not check_files(filename):
+        raise WebexLogoError(f"fleet inventory file '{filename}' cannot be found")
+    inventory = configparser.ConfigParser()
+    try:
+        inventory.read(filename)
+    except Exception as e:
+        raise WebexLogoError(f"reading fleet inventory file.\n    ERROR: {e}")
+    devices = []
+    for device_name in inventory.sections():
+        device = inventory[device_name]
+        if "endpoint_ip" not in device:
+            raise WebexLogoError(f"fleet inventory: device [{device_name}] has no endpoint_ip")
+        devices.append({
+            "name": device_name,
+            "endpoint_ip": device["endpoint_ip"],
+            "client": DeviceClient.from_settings(settings, device["endpoint_ip"], device.get("my_token_xapi")),
+            "slot": device.get("my_user_image_location", settings.my_user_image_location)
+        })
+    if len(devices) == 0:
+        raise WebexLogoError(f"fleet inventory '{filename}' contains no devices")
+    return devices
+
+
+# ___ update one fleet device. image_bytes None: only switch slot. RETURNS: result dict
+def fleet_push(device, image_bytes, new_slot, force=False):
+    slot = new_slot if new_slot != "" else device["slot"]
+    client = device["client"]
+    start_time = time.perf_counter()
+    with trace.stage("fleet device", device=device["name"]):
+        if image_bytes is None:
+            xapiresult = client.switch_background(slot, False)
+            errors = [xapiresult] if "**ERROR**" in xapiresult else []
+        else:
+            errors = client.push_background(image_bytes, slot, fleet=True, force=force)
+    latency = time.perf_counter() - start_time
+    client.close()
+    status = "FAILED" if errors else "OK"
+    print(f"     {status:<7}{device['name']} ({device['endpoint_ip']}) {latency:.2f}s")
+    return {"device": device, "slot": slot, "errors": errors, "latency": latency}
+
+
+# ___ run one command on all devices in the fleet inventory, then print a summary
+def run_fleet(settings, command, force=False):
+    devices = read_inventory(settings, settings.fleet_inventory)
+    workers = max(1, min(settings.fleet_concurrency, len(devices)))
+    print(f"2___ FLEET: {len(devices)} devices from '{settings.fleet_inventory}' (max {workers} at a time)")
+    commandline_count = len(command.split(" "))
+    commandline_part1 = command.split(" ")[0]
+    if command in ["", "watch"] or commandline_part1 == "prefetch":
+        raise WebexLogoError("fleet mode works with logo, text, clear and user1/2/3 commands (one device reads participants)")
+    elif commandline_count == 1 and commandline_part1.lower() in ["user1", "user2", "user3"]:
+        image_bytes = None          # --- SWITCH all devices to user1/2/3
+        new_slot = commandline_part1
+        print(f"     Switching to {new_slot}")
+    else:                           # --- render ONCE, upload to all devices
+        with trace.stage("render background"):
+            image_bytes, new_slot = render_background(settings, None, command)
+        print("3___ PREPARE background upload")
+    print(f"4___ UPDATING {len(devices)} video devices")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda device: fleet_push(device, image_bytes, new_slot, force), devices))
+    # _______5____ SUMMARY
+    failed = [result for result in results if result["errors"]]
+    print("5___ FLEET summary")
+    print(f"     {'DEVICE':<20}{'IP':<18}{'SLOT':<8}{'RESULT':<8}TIME")
+    for result in results:
+        device = result["device"]
+        status = "FAILED" if result["errors"] else "OK"
+        print(f"     {device['name']:<20}{device['endpoint_ip']:<18}{result['slot']:<8}{status:<8}{result['latency']:.2f}s")
+        for error in result["errors"]:
+            print(f"          {error}")
+        print(f"          {device['client'].timing_summary()}")
+    print(f"     {len(results)} devices: {len(results) - len(failed)} ok, {len(failed)} failed")
+    return results
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Find the logo (or background image) for a command and download it into
+my_logofolder. Downloaded files are cached and revalidated after logo_cache_ttl.
+Emails and (sub)domains of one customer share one logo file: '<domain>.png'."""
+import email.utils      # http dates for logo cache revalidation
+import hashlib
+import os
+import shutil
+import threading
+import time
+import requests
+import urllib.parse
+import urllib3   # <- and below: added to skip insecure SSH errors
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from .common import WebexLogoError, check_files, read_json_file, write_json_file
+from .domains import registrable_domain
+from . import trace
+
+images = ['jpg','png','jpeg']
+
+
+# ___ logo cache metadata (my_logofolder/_logo_meta.json): per logo file the URL, ETag,
+#     Last-Modified and fetch time. Per URL the time it returned 404 (known missing logo).
+#     Aliases: per domain or URL the logo file it uses (can be edited, e.g.
+#     "acme-corp.com": "acme.com.png" gives a subsidiary the logo of its parent)
+logo_metas = dict()         # metadata file -> metadata
+logo_meta_lock = threading.Lock()
+http_session = requests.Session()     # keeps connections to logo servers open
+downloaded_logos = set()    # logo files downloaded by this run
+
+
+def load_logo_meta(meta_file):      # call with logo_meta_lock
+    if meta_file not in logo_metas:
+        logo_meta = read_json_file(meta_file)
+        logo_meta.setdefault("logos", {})
+        logo_meta.setdefault("missing", {})
+        logo_meta.setdefault("aliases", {})
+        logo_metas[meta_file] = logo_meta
+    return logo_metas[meta_file]
+
+
+def read_logo_meta(settings, section, key):
+    with logo_meta_lock:
+        return load_logo_meta(settings.my_logofolder + "/_logo_meta.json")[section].get(key)
+
+
+# ___ remember logo metadata ("logos"), a missing logo URL ("missing") or the logo file of
+#     a domain/URL ("aliases"). value None: forget it
+def update_logo_meta(settings, section, key, value):
+    meta_file = settings.my_logofolder + "/_logo_meta.json"
+    with logo_meta_lock:
+        meta_section = load_logo_meta(meta_file)[section]
+        if value is None:
+            meta_section.pop(key, None)
+        else:
+            meta_section[key] = value
+        write_json_file(meta_file, logo_metas[meta_file])
+
+
+# ___ save a downloaded logo (200 response) and its metadata
+def save_logo(settings, r, logofile, logocommand):
+    r.raw.decode_content = True
+    tmp_filename = f"{settings.my_logofolder}/{logofile}.{threading.get_ident()}.tmp"
+    with open(tmp_filename, 'wb') as f:  # other threads never see half a file
+        shutil.copyfileobj(r.raw, f)
+        trace.add(download_bytes=f.tell())
+    os.replace(tmp_filename, settings.my_logofolder + "/" + logofile)
+    downloaded_logos.add(logofile)
+    update_logo_meta(settings, "logos", logofile, {"url": logocommand, "etag": r.headers.get("ETag"),
+                                                   "last_modified": r.headers.get("Last-Modified"), "fetched": time.time()})
+
+
+# ___ if there is no locally cached logo file: download it.
+#     A cached logo older than logo_cache_ttl is revalidated (conditional GET)
+def download_logo(settings, logofile, logocommand):
+    my_logofolder = settings.my_logofolder
+    logofile_exists = check_files(my_logofolder + "/" + logofile)
+    meta = read_logo_meta(settings, "logos", logofile) or {}
+    if logofile_exists:
+        fetched = meta.get("fetched", os.path.getmtime(my_logofolder + "/" + logofile))
+        if logocommand == "" or time.time() - fetched < settings.logo_cache_ttl:
+            print(f"     LOCAL FILE EXISTS. Using '{logofile}' (download_logo)")
+            return logofile
+        # --- cached file is old: download only if it changed on the server
+        print(f"     LOCAL FILE EXISTS. Checking for changes: '{logofile}' (download_logo)")
+        request_headers = dict()
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+        else:
+            request_headers["If-Modified-Since"] = email.utils.formatdate(fetched, usegmt=True)
+        try:
+            r = http_session.get(logocommand, headers=request_headers, stream=True, timeout=settings.http_timeout)
+        except requests.RequestException as e:
+            print(f"     *NOTE* can't check for changes, using cached file: {e}")
+            return logofile
+        with r:
+            trace.add(url=logocommand, status=r.status_code)
+            if r.status_code == 200:
+                print(f"     DOWNLOAD IMAGE (changed): {logofile} (download_logo)")
+                save_logo(settings, r, logofile, logocommand)
+            elif r.status_code == 304:
+                meta.update({"url": logocommand, "fetched": time.time()})
+                update_logo_meta(settings, "logos", logofile, meta)
+            else:
+                print(f"     *NOTE* check for changes returned {r.status_code}, using cached file")
+        return logofile
+    elif logocommand != "":        # --- command NOT EMPTY = image URL
+        missing_time = read_logo_meta(settings, "missing", logocommand)
+        if missing_time is not None and time.time() - missing_time < settings.logo_missing_ttl:
+            raise WebexLogoError(f"no image for {logofile}: not found at {time.strftime('%Y-%m-%d %H:%M', time.localtime(missing_time))} (download_logo)")
+        print(f"     DOWNLOAD IMAGE: {logofile} (download_logo)")
+        try:
+            r = http_session.get(logocommand, stream=True, timeout=settings.http_timeout)
+        except requests.RequestException as e:
+            raise WebexLogoError(f"downloading image {logofile}: {e}")
+        with r:
+            trace.add(url=logocommand, status=r.status_code)
+            if r.status_code == 200:
+                save_logo(settings, r, logofile, logocommand)
+                update_logo_meta(settings, "missing", logocommand, None)
+                return logofile
+            if r.status_code in [404, 410]:     # no logo: don't ask again for a while
+                update_logo_meta(settings, "missing", logocommand, time.time())
+        raise WebexLogoError(f"download_logo RESULT: {r.status_code} (download_logo)")
+    else: # --- file does not exist + no image URL
+        raise WebexLogoError(f"local file does not exist: '{my_logofolder}/{logofile}' (download_logo)")
+
+
+def filename_clean(filename):
+    invalid = '<>:"/\\|?* '
+    for char in invalid:
+        filename = filename.replace(char, '-')
+    return filename
+
+
+# ___ file name for an image URL: name in the URL + part of the URL's hash, so images with
+#     the same name at different URLs don't overwrite each other. 'https://x/a/logo.png'
+#     -> 'logo-1a2b3c4d5e6f.png'
+def url_filename(url):
+    image_name = urllib.parse.urlsplit(url).path.rsplit('/', 1)[-1] or "image"
+    if '.' not in image_name:
+        image_name += ".jpg"
+    image_stem, image_extension = image_name.rsplit('.', 1)
+    url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+    return filename_clean(f"{image_stem}-{url_hash}.{image_extension}")
+
+
+# ___ check what should be done and how. RETURNS: logo filename
+#     background=True: logo_info is a new background image (user1/2/3 FILE_NAME/URL)
+def get_logo(settings, logo_info, background=False):
+    my_logofolder = settings.my_logofolder
+    alias_key = None        # domain or URL: remembered in the aliases
+    if '@' in logo_info:  # ---- received email address with domain ------------
+        alias_key = logo_info.split('@')[-1].strip().lower()
+        customer_domain = registrable_domain(alias_key, settings.public_suffix_file)
+        print(f"     '@' in parameter: {customer_domain} (get_logo)")
+        if not "." in customer_domain:
+            raise WebexLogoError(f"customer domain doesn't contain a '.':  {customer_domain}")
+        getlogo_command = "https://logo.clearbit.com/www." + customer_domain
+        customer_domain += ".png"
+    elif 'http' in logo_info:   # ---- received URL to image -------------------
+        if background:
+            print(f"     NEW_BACKGROUND url: {logo_info}")
+        alias_key = getlogo_command = logo_info
+        customer_domain = url_filename(logo_info)
+    elif logo_info.split('.')[-1].lower() in images: #  LOCAL image ------------
+        if background:
+            print(f"     NEW background: {logo_info} (get_logo)")
+        print(f"     LOCAL image: {my_logofolder}/{logo_info} (get_logo)")
+        getlogo_command = ""
+        customer_domain = logo_info
+    elif "text" in logo_info: # ---- Add text instead of logo ------------------
+        customer_domain = "text"
+        getlogo_command = "text"
+    else:    # ---- received just a domain name --------------------------------
+        if not "." in logo_info:
+            raise WebexLogoError(f"customer domain doesn't contain a dot:  '{logo_info}'")
+        alias_key = logo_info.strip().lower()
+        customer_domain = registrable_domain(alias_key, settings.public_suffix_file)
+        print(f"     DOMAIN NAME only: {customer_domain} (get_logo)")
+        getlogo_command = "https://logo.clearbit.com/www." + customer_domain
+        customer_domain += ".png"
+    # --- alias: this domain/URL uses an existing logo file, no download
+    alias = read_logo_meta(settings, "aliases", alias_key) if alias_key else None
+    if alias is not None and alias != customer_domain and check_files(my_logofolder + "/" + alias):
+        print(f"     ALIAS: '{alias_key}' uses '{alias}' (get_logo)")
+        customer_domain = alias
+        getlogo_command = (read_logo_meta(settings, "logos", alias) or {}).get("url", "")
+    # NOW _download_ the actual file and return the downloaded filename
+    if customer_domain != "text":
+        with trace.stage("download logo", file=customer_domain):
+            logofile = download_logo(settings, customer_domain, getlogo_command)
+        if alias_key and alias != logofile:
+            update_logo_meta(settings, "aliases", alias_key, logofile)
+        return_filename = my_logofolder + "/" + logofile
+    else:
+        return_filename = "text"
+    return return_filename
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Prefetch: download logos for a list of upcoming meetings and create their
+backgrounds in the render cache."""
+import csv
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .common import WebexLogoError, check_files
+from .logos import get_logo, downloaded_logos
+from .backgrounds import logo_render_parts, encode_render_parts, build_background
+from . import trace
+
+
+# ___ read emails, domains or URLs for prefetch: one per line or csv row ('-': stdin).
+#     Per row the first cell with '@' or 'http', else the first cell that looks like a domain
+def read_prefetch_list(source):
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    elif check_files(source):
+        with open(source, newline='') as f:
+            lines = f.read().splitlines()
+    else:
+        raise WebexLogoError(f"prefetch list '{source}' cannot be found")
+    entries = []
+    for row in csv.reader(lines):
+        cells = [cell.strip() for cell in row if cell.strip() != ""]
+        entry = next((cell for cell in cells if '@' in cell or cell.startswith('http')), None)
+        if entry is None:
+            entry = next((cell for cell in cells if '.' in cell and ' ' not in cell), None)
+        if entry is not None and entry not in entries:   # no entry: header or empty row
+            entries.append(entry)
+    return entries
+
+
+# ___ prefetch: download one logo (thread). RETURNS: entry, logo filename (None: failed)
+def prefetch_logo(settings, entry):
+    try:
+        return entry, get_logo(settings, entry)
+    except WebexLogoError as e:
+        print(f"     **ERROR** {entry}: {e}")
+        return entry, None
+
+
+# ___ prefetch: create one logo background into the render cache (worker process)
+prerender_settings = None
+
+
+def prerender_init(settings):
+    global prerender_settings
+    prerender_settings = settings
+
+
+def prerender_logo(new_logo):
+    try:
+        render_parts = logo_render_parts(prerender_settings, new_logo) + encode_render_parts(prerender_settings)
+        image_bytes, cache_hit = build_background(prerender_settings, render_parts, new_logo, save_result=False)
+        return "hit" if cache_hit else "new"
+    except Exception as e:      # WebexLogoError, or e.g. downloaded file is not an image
+        print(f"     **ERROR** creating background for {new_logo}: {e}")
+        return "FAILED"
+
+
+# ___ download logos for a list of upcoming meetings and create their backgrounds, so
+#     later runs for these customers are render cache hits. Prints a report.
+def run_prefetch(settings, source):
+    entries = read_prefetch_list(source)
+    print(f"2___ PREFETCH: {len(entries)} emails/domains/URLs, {settings.prefetch_workers} downloads at a time")
+    with trace.stage("prefetch downloads", entries=len(entries)), ThreadPoolExecutor(max_workers=settings.prefetch_workers) as pool:
+        logos = list(pool.map(lambda entry: prefetch_logo(settings, entry), entries))
+    logo_files = sorted(set(new_logo for entry, new_logo in logos if new_logo is not None))
+    print(f"3___ CREATING {len(logo_files)} backgrounds ({os.cpu_count()} processes)")
+    with trace.stage("prefetch backgrounds", logos=len(logo_files)), ProcessPoolExecutor(initializer=prerender_init, initargs=(settings,)) as pool:
+        renders = dict(zip(logo_files, pool.map(prerender_logo, logo_files)))
+    # _______4____ REPORT
+    print("4___ PREFETCH report")
+    print(f"     {'EMAIL/DOMAIN/URL':<40}{'LOGO':<12}BACKGROUND")
+    logo_results, render_results = [], []
+    for entry, new_logo in logos:
+        if new_logo is None:
+            logo_result, render_result = "FAILED", "-"
+        else:
+            logo_result = "downloaded" if new_logo.rsplit('/', 1)[-1] in downloaded_logos else "cached"
+            render_result = renders[new_logo]
+        logo_results.append(logo_result)
+        render_results.append(render_result)
+        print(f"     {entry[:39]:<40}{logo_result:<12}{render_result}")
+    print(f"     logos: {logo_results.count('cached')} cached, {logo_results.count('downloaded')} downloaded, {logo_results.count('FAILED')} failed")
+    print(f"     backgrounds: {render_results.count('hit')} cache hits, {render_results.count('new')} new, {render_results.count('FAILED')} failed")
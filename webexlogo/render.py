@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Image functions (Pillow): resize a logo and put it on the background, add text,
+encode the result (JPEG)."""
+import functools
+import math
+from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageStat
+
+min_fontsize = 16
+min_jpeg_quality = 30
+logo_gap = 0.08         # space between logos: part of the logo area's smallest side
+resample_filters = {"nearest": Image.NEAREST, "bilinear": Image.BILINEAR, "bicubic": Image.BICUBIC, "lanczos": Image.LANCZOS}
+
+
+# ___ encode the background for upload: always JPEG (a photo background + logo is
+#     far smaller as JPEG than as PNG). Tries qualities from 'quality' down to
+#     min_jpeg_quality (4:4:4 chroma at quality >= 90, 4:2:0 below; a lower 'quality' is
+#     raised to min_jpeg_quality) with a binary search:
+#     min_psnr > 0: smallest file with at least this PSNR (dB) compared to the image
+#     max_bytes > 0: largest file that is not bigger than max_bytes (wins from min_psnr)
+#     RETURNS: encoded image bytes, dict with quality, subsampling, psnr, tries
+def encode_image(imageobject, quality=85, max_bytes=0, min_psnr=0):
+    if imageobject.mode not in ["RGB", "RGBX"]:     # RGBX (mapped base image): encoded as is
+        imageobject = imageobject.convert('RGB')
+    quality = max(quality, min_jpeg_quality)
+    original = imageobject                          # compared with the decoded jpeg
+    if imageobject.mode != "RGB" and (min_psnr > 0 or max_bytes > 0):
+        original = imageobject.convert('RGB')
+    ladder = [(q, "4:4:4" if q >= 90 else "4:2:0") for q in range(quality, min_jpeg_quality - 1, -1)]
+    encoded = dict()        # ladder position -> jpeg bytes
+
+    def encode(position):
+        if position not in encoded:
+            buffer = BytesIO()
+            jpeg_quality, subsampling = ladder[position]
+            imageobject.save(buffer, format="jpeg", quality=jpeg_quality, subsampling=subsampling)
+            encoded[position] = buffer.getvalue()
+        return encoded[position]
+
+    # highest position (lowest quality) where test is True; positions before it are True too
+    def last_true(test, low, high):
+        found = low - 1
+        while low <= high:
+            middle = (low + high) // 2
+            if test(middle):
+                found, low = middle, middle + 1
+            else:
+                high = middle - 1
+        return found
+
+    position = 0
+    if min_psnr > 0:        # lowest quality that still looks good enough
+        position = max(0, last_true(lambda position: image_psnr(original, encode(position)) >= min_psnr, 0, len(ladder) - 1))
+    if max_bytes > 0 and len(encode(position)) > max_bytes:     # first quality that fits
+        position = min(len(ladder) - 1, last_true(lambda position: len(encode(position)) > max_bytes, position, len(ladder) - 1) + 1)
+    image_bytes = encode(position)
+    info = {"quality": ladder[position][0], "subsampling": ladder[position][1], "tries": len(encoded)}
+    if min_psnr > 0 or max_bytes > 0:
+        info["psnr"] = round(image_psnr(original, image_bytes), 1)
+    return image_bytes, info
+
+
+# ___ PSNR (dB) of encoded image bytes compared to the original image. Higher: closer
+def image_psnr(imageobject, image_bytes):
+    decoded = Image.open(BytesIO(image_bytes)).convert('RGB')
+    squares = ImageStat.Stat(ImageChops.difference(imageobject, decoded)).sum2
+    mse = sum(squares) / (imageobject.width * imageobject.height * len(squares))
+    return 100.0 if mse == 0 else 10 * math.log10(255 * 255 / mse)
+
+
+# ___ open an image at the device resolution (target_size, None: as is): larger images are
+#     resized to cover target_size and center cropped. A JPEG is decoded at 1/2, 1/4 or
+#     1/8 size (draft mode) when that is still large enough: less decode time and memory.
+#     RETURNS: image, fit (scale, crop_x, crop_y, original width, original height)
+def open_fitted(filename, target_size=None, resample="lanczos"):
+    im = Image.open(filename)
+    original_size = im.size
+    scale = max(target_size[0] / im.width, target_size[1] / im.height) if target_size else 1.0
+    if scale >= 1:      # not larger than the device: as is
+        im.load()
+        return im, (1.0, 0, 0) + original_size
+    cover_size = (max(round(im.width * scale), target_size[0]), max(round(im.height * scale), target_size[1]))
+    im.draft("RGB", cover_size)     # only JPEG, others ignore it
+    im = resize_image(logo_image(im), cover_size, resample)
+    crop_x, crop_y = (cover_size[0] - target_size[0]) // 2, (cover_size[1] - target_size[1]) // 2
+    im = im.crop((crop_x, crop_y, crop_x + target_size[0], crop_y + target_size[1]))
+    return im, (scale, crop_x, crop_y) + original_size
+
+
+# ___ logo in a mode that resizes smoothly: RGBA when it has transparency, else RGB or L
+def logo_image(imLogo):
+    has_alpha = "transparency" in imLogo.info or "A" in imLogo.mode or "a" in imLogo.mode
+    if has_alpha and imLogo.mode != "RGBA":
+        return imLogo.convert("RGBA")
+    if not has_alpha and imLogo.mode not in ["RGB", "L"]:
+        return imLogo.convert("RGB")
+    return imLogo
+
+
+# ___ resize with a resample filter (name in resample_filters). RGBA is resized with
+#     premultiplied alpha, so the color of transparent pixels doesn't show at the edges.
+#     Large downscales first reduce by a whole factor (reducing_gap): much faster, same look
+def resize_image(im, size, resample="lanczos"):
+    resample = resample_filters[resample]
+    if resample == Image.NEAREST:
+        return im.resize(size, resample)
+    if im.mode == "RGBA":       # Pillow premultiplies itself, but then ignores reducing_gap
+        return im.convert("RGBa").resize(size, resample, reducing_gap=2.0).convert("RGBA")
+    return im.resize(size, resample, reducing_gap=2.0)
+
+
+# resize logo - RETURNS: image object + image destination resolution
+#     middle_x/middle_y: center of the logo area. resample: name in resample_filters
+def resizeLogo(imLogo, max_w, max_h, scale_logo, middle_x, middle_y, resample="lanczos"):
+    imLogo = logo_image(imLogo)
+    imLogo_x, imLogo_y = imLogo.size
+    pctLogo_x = max_w / imLogo_x    # width compared to max withd (x)
+    pctLogo_y = max_h / imLogo_y    # height compared to max height (y)
+    oneIsSmaller = pctLogo_x < 1 or pctLogo_y < 1    # width OR  height bigger  than max
+    bothAreBigger = pctLogo_x > 1 and pctLogo_y > 1  # width AND height smaller than max
+    if scale_logo and ( (oneIsSmaller) or (bothAreBigger) ):
+        if pctLogo_x > pctLogo_y:   # scale down by factor of Y
+            new_width  = imLogo_x * pctLogo_y
+            new_height = imLogo_y * pctLogo_y
+        else:                       # scale down by factor of X
+            new_width  = imLogo_x * pctLogo_x
+            new_height = imLogo_y * pctLogo_x
+        imLogoResized = resize_image(imLogo, (max(int(new_width), 1), max(int(new_height), 1)), resample)
+        newstart_x = middle_x - int(imLogoResized.width/2)
+        newstart_y = middle_y - int(imLogoResized.height/2)
+        imLogo = imLogoResized
+    else:
+        newstart_x = middle_x - int(imLogo_x/2)
+        newstart_y = middle_y - int(imLogo_y/2)
+    return imLogo, newstart_x, newstart_y
+
+
+# ___ grid for several logos in the logo area: the number of columns where the logos,
+#     scaled to fit their cell, cover the largest area. A last row that isn't full is
+#     centered. RETURNS: per logo (row by row) its cell: max_w, max_h, middle_x, middle_y
+def logo_cells(logo_sizes, startX, startY, max_w, max_h):
+    count = len(logo_sizes)
+    gap = int(min(max_w, max_h) * logo_gap)
+
+    def cell_size(columns):
+        rows = math.ceil(count / columns)
+        return (max_w - gap * (columns - 1)) / columns, (max_h - gap * (rows - 1)) / rows
+
+    def covered_area(columns):
+        cell_w, cell_h = cell_size(columns)
+        if cell_w < 1 or cell_h < 1:
+            return 0
+        return sum(w * h * min(cell_w / w, cell_h / h) ** 2 for w, h in logo_sizes)
+
+    columns = max(range(1, count + 1), key=covered_area)
+    cell_w, cell_h = cell_size(columns)
+    cells = []
+    for index in range(count):
+        row, column = divmod(index, columns)
+        row_logos = min(columns, count - row * columns)
+        row_start = startX + (columns - row_logos) * (cell_w + gap) / 2
+        middle_x = int(row_start + column * (cell_w + gap) + cell_w / 2)
+        middle_y = int(startY + row * (cell_h + gap) + cell_h / 2)
+        cells.append((int(cell_w), int(cell_h), middle_x, middle_y))
+    return cells
+
+
+# ___ put the logo on the background: a logo with transparency is alpha blended (its
+#     alpha is the paste mask), others are copied. Only the logo area changes.
+def paste_logo(imBackground, imLogo, start_x, start_y):
+    imLogo = logo_image(imLogo)
+    if imLogo.mode == "RGBA":
+        imBackground.paste(imLogo, (start_x, start_y), imLogo)
+    else:
+        imBackground.paste(imLogo, (start_x, start_y))
+    return imBackground
+
+
+# ___ load a font. Cached per (font file, size): loading reads and parses the font file
+@functools.lru_cache(maxsize=128)
+def load_font(fontfile, fontsize):
+    return ImageFont.truetype(fontfile, fontsize)
+
+
+# ___ bounding box (left, top, right, bottom) of (multi-line) text drawn at 0,0
+text_measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
+def text_box(msg, my_font):
+    return text_measure.multiline_textbbox((0, 0), msg, font=my_font)
+
+
+# ___ find the largest font size <= my_fontsize where text fits in max_w AND max_h.
+#     Binary search: text size grows with the font size. Sizes < min_fontsize are not
+#     searched. RETURNS: font size (min_fontsize - 1: nothing fits), font, text box
+def fit_text(msg, fontfile, my_fontsize, max_w, max_h):
+    text_boxes = dict()
+
+    def text_fits(fontsize):
+        left, top, right, bottom = text_boxes[fontsize] = text_box(msg, load_font(fontfile, fontsize))
+        return right - left <= max_w and bottom - top <= max_h
+
+    if text_fits(my_fontsize):
+        fontsize = my_fontsize
+    else:
+        # text size is roughly proportional to font size: start below that estimate + 10%
+        left, top, right, bottom = text_boxes[my_fontsize]
+        scale = min(max_w / max(right - left, 1), max_h / max(bottom - top, 1))
+        fontsize = min_fontsize - 1
+        low, high = min_fontsize, min(my_fontsize - 1, int(my_fontsize * scale * 1.1) + 1)
+        while low <= high:
+            middle = (low + high) // 2
+            if text_fits(middle):
+                fontsize = middle
+                low = middle + 1
+            else:
+                high = middle - 1
+    final_fontsize = max(fontsize, min_fontsize)
+    if final_fontsize not in text_boxes:
+        text_boxes[final_fontsize] = text_box(msg, load_font(fontfile, final_fontsize))
+    return fontsize, load_font(fontfile, final_fontsize), text_boxes[final_fontsize]
+
+
+# ___ text as an RGBA layer: the font color, with the drawn text as alpha. Font size:
+#     the largest <= my_fontsize where the text fits in max_w x max_h (fit_text).
+#     Pasted at (middle of the logo area + offset) it gives the same pixels as drawing
+#     the text centered on the background. RETURNS: layer, offset_x, offset_y, font size
+def text_layer(msg, fontfile, my_fontsize, max_w, max_h, fontcolor):
+    fitted_fontsize, my_font, (left, top, right, bottom) = fit_text(msg, fontfile, my_fontsize, max_w, max_h)
+    # draw position relative to the middle of the logo area (centered: may be half a pixel)
+    draw_x, draw_y = -(right - left) / 2 - left, -(bottom - top) / 2 - top
+    # margin: glyph edges and overhangs can be drawn just outside the text box
+    margin = my_font.size // 4 + 2
+    offset_x, offset_y = math.floor(draw_x) - margin, math.floor(draw_y) - margin
+    mask = Image.new("L", (max(right, 0) + 2 * margin + 2, max(bottom, 0) + 2 * margin + 2))
+    ImageDraw.Draw(mask).multiline_text((draw_x - offset_x, draw_y - offset_y), msg, font=my_font, fill=255)
+    ink_box = mask.getbbox() or (0, 0, 1, 1)    # only the drawn pixels
+    mask = mask.crop(ink_box)
+    layer = Image.new("RGBA", mask.size, fontcolor)
+    layer.putalpha(mask)
+    return layer, offset_x + ink_box[0], offset_y + ink_box[1], fitted_fontsize
+
+
+def print_fontsize_note(fitted_fontsize, my_fontsize):
+    if fitted_fontsize < min_fontsize:
+        print(f"     Calculated font size smaller than minimum, change to: {min_fontsize}")
+    elif fitted_fontsize != my_fontsize:
+        print(f"     NOTE: Font-size changed to {fitted_fontsize} to fit in the max space")
+
+
+# ADD TEXT to image - returns image object
+#     settings: font file/color and the logo area the text is centered in
+def addText(imBackground,msg,my_fontsize,settings):
+    msg = msg.replace("##","\n")
+    # find font size where the text fits in the logo area, draw it on a layer
+    layer, offset_x, offset_y, fitted_fontsize = text_layer(msg, settings.my_fontfile, my_fontsize, settings.max_w, settings.max_h, settings.my_fontcolor)
+    print_fontsize_note(fitted_fontsize, my_fontsize)
+    return paste_logo(imBackground, layer, settings.middle_x + offset_x, settings.middle_y + offset_y)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""Service mode: a small local HTTP API, so booking or room systems can change
+backgrounds without starting the script for each change.
+
+    POST /jobs       {"command": "acme.com", "device": "meetingroom-1", "slot": "User3", "force": false}
+                     command: like the command line (logo, text ..., clear, user1/2/3 [FILE/URL])
+                     device: name in the fleet inventory, default: endpoint_ip from the settings
+                     slot: User1, User2 or User3 (any case), force: true or false
+    GET  /jobs/ID    status and latency of a job
+    GET  /jobs       recent jobs
+    GET  /status     devices, queued jobs, counters, latency
+
+A job that is still queued is replaced by a newer job for the same device (endpoint_ip) and slot
+(last write wins), so a burst of updates is one upload per device and slot."""
+import itertools
+import json
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .common import WebexLogoError, check_files
+from .device import DeviceClient
+from .backgrounds import render_background
+from . import trace
+
+max_finished_jobs = 1000    # finished jobs kept for GET /jobs/ID
+
+
+class JobService:
+    """Job queue: per device and slot at most one queued and one running job.
+    Jobs start service_debounce seconds after they are queued, on a pool of
+    service_workers threads. Uploads to one device run one at a time.
+    A device is its endpoint_ip: names in the inventory for the same device share
+    its queue and lock."""
+
+    def __init__(self, settings, force=False):
+        self.settings = settings
+        self.force = force
+        self.devices = {"default": {"name": "default", "endpoint_ip": settings.endpoint_ip,
+                                    "client": DeviceClient.from_settings(settings),
+                                    "slot": settings.my_user_image_location}}
+        if check_files(settings.fleet_inventory):      # devices from the fleet inventory (by name)
+            from .fleet import read_inventory
+            for device in read_inventory(settings, settings.fleet_inventory):
+                self.devices[device["name"]] = device
+        self.device_locks = {device["endpoint_ip"]: threading.Lock() for device in self.devices.values()}
+        self.lock = threading.Lock()
+        self.jobs = dict()          # id -> job
+        self.queued = dict()        # (endpoint_ip, slot) -> job waiting to start
+        self.running = set()        # (endpoint_ip, slot) with a job being processed
+        self.job_ids = itertools.count(1)
+        self.counters = {"submitted": 0, "replaced": 0, "done": 0, "failed": 0, "uploads": 0}
+        self.pool = ThreadPoolExecutor(max_workers=settings.service_workers, thread_name_prefix="job")
+
+    # ___ queue a job. RETURNS: copy of the job (dict). Raises ValueError for a bad request
+    def submit(self, request):
+        for field in ["command", "device", "slot"]:
+            if request.get(field) is not None and not isinstance(request[field], str):
+                raise ValueError(f"{field} must be a string")
+        command = (request.get("command") or "").strip()
+        device_name = request.get("device") or "default"
+        if command == "" or command.split(" ")[0] in ["watch", "prefetch", "fleet", "serve"]:
+            raise ValueError("command must be a logo, text, clear or user1/2/3 command")
+        if device_name not in self.devices:
+            raise ValueError(f"unknown device '{device_name}', devices: {', '.join(self.devices)}")
+        slot = job_slot(command, request.get("slot") or self.devices[device_name]["slot"])
+        if str(slot).lower() not in ["user1", "user2", "user3"]:     # slot is sent in the xAPI command
+            raise ValueError(f"slot must be User1, User2 or User3, not '{slot}'")
+        slot = slot.capitalize()
+        force = request.get("force", self.force)
+        if not isinstance(force, bool):
+            raise ValueError("force must be true or false (JSON boolean)")
+        job = {"id": next(self.job_ids), "device": device_name, "slot": slot, "command": command,
+               "force": force, "status": "queued", "errors": [],
+               "submitted": time.time(), "started": None, "finished": None,
+               "queue_ms": None, "render_ms": None, "upload_ms": None, "total_ms": None}
+        key = (self.devices[device_name]["endpoint_ip"], slot)
+        with self.lock:
+            self.counters["submitted"] += 1
+            self.jobs[job["id"]] = job
+            replaced_job = self.queued.get(key)
+            if replaced_job is not None:
+                replaced_job.update(status="replaced", replaced_by=job["id"], finished=time.time())
+                self.counters["replaced"] += 1
+            self.queued[key] = job
+            if replaced_job is None and key not in self.running:
+                self.schedule(key)
+            self.forget_old_jobs()
+            job_copy = dict(job)
+        print(f"     JOB {job['id']} queued: {device_name}/{slot} '{command}'"
+              + (f" (replaces job {replaced_job['id']})" if replaced_job is not None else ""))
+        return job_copy
+
+    # ___ start the queued job of a device + slot after service_debounce seconds: jobs
+    #     that arrive in the meantime replace it
+    def schedule(self, key):
+        timer = threading.Timer(self.settings.service_debounce, lambda: self.pool.submit(self.run_queued, key))
+        timer.daemon = True
+        timer.start()
+
+    # ___ worker: run the queued job of a device + slot (if it wasn't replaced by then)
+    def run_queued(self, key):
+        with self.lock:
+            job = self.queued.pop(key, None)
+            if job is None:
+                return
+            self.running.add(key)
+        try:
+            self.run_job(job)
+        except Exception as e:      # keep the worker running, report it in the job
+            job.update(status="failed", errors=job["errors"] + [f"{type(e).__name__}: {e}"])
+        finally:
+            with self.lock:
+                self.running.discard(key)
+                self.counters["failed" if job["status"] == "failed" else "done"] += 1
+                if key in self.queued:      # newer job arrived while this one ran
+                    self.schedule(key)
+
+    def run_job(self, job):
+        device = self.devices[job["device"]]
+        client = device["client"]
+        job.update(status="rendering", started=time.time())
+        job["queue_ms"] = round((job["started"] - job["submitted"]) * 1000)
+        with trace.stage("service job", job=job["id"], device=job["device"]):
+            command = job["command"]
+            start_time = time.perf_counter()
+            if len(command.split(" ")) == 1 and command.lower() in ["user1", "user2", "user3"]:
+                image_bytes = None          # --- switch to user1/2/3
+            else:
+                try:
+                    image_bytes, new_slot = render_background(self.settings, client, command)
+                except WebexLogoError as e:     # e.g. logo download failed
+                    image_bytes, job["errors"] = None, [f"background not created: {e}"]
+            job["render_ms"] = round((time.perf_counter() - start_time) * 1000)
+            if not job["errors"]:
+                job["status"] = "uploading"
+                start_time = time.perf_counter()
+                with self.device_locks[device["endpoint_ip"]]:
+                    if image_bytes is None:
+                        xapiresult = client.switch_background(job["slot"], False)
+                        job["errors"] = [xapiresult] if "**ERROR**" in xapiresult else []
+                    else:
+                        job["errors"] = client.push_background(image_bytes, job["slot"], fleet=True, force=job["force"])
+                        with self.lock:
+                            self.counters["uploads"] += 1
+                job["upload_ms"] = round((time.perf_counter() - start_time) * 1000)
+        job.update(status="failed" if job["errors"] else "done", finished=time.time())
+        job["total_ms"] = round((job["finished"] - job["submitted"]) * 1000)
+        print(f"     JOB {job['id']} {job['status']}: {job['device']}/{job['slot']} '{job['command']}' in {job['total_ms']} ms "
+              f"(queue {job['queue_ms']}, render {job['render_ms']}, upload {job['upload_ms']})"
+              + "".join(f"\n          {error}" for error in job["errors"]))
+
+    # ___ remove the oldest finished jobs (call with self.lock)
+    def forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ["done", "failed", "replaced"]]
+        for job_id in finished[:max(0, len(finished) - max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def status(self):
+        with self.lock:
+            total_times = [job["total_ms"] for job in self.jobs.values() if job["total_ms"] is not None]
+            return {"devices": {name: {"endpoint_ip": device["endpoint_ip"], "slot": device["slot"]}
+                                for name, device in self.devices.items()},
+                    "queued": len(self.queued), "running": len(self.running), "counters": dict(self.counters),
+                    "latency_ms": {"jobs": len(total_times),
+                                   "average": round(sum(total_times) / len(total_times)) if total_times else None,
+                                   "max": max(total_times, default=None)}}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for device in self.devices.values():
+            device["client"].close()
+
+
+# ___ slot a command changes: user1/2/3 commands name their slot, others use 'slot'
+def job_slot(command, slot):
+    commandline_part1 = command.split(" ")[0]
+    if commandline_part1.lower() in ["user1", "user2", "user3"]:
+        return commandline_part1.capitalize()
+    return slot
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/status":
+            self.reply(200, service.status())
+        elif self.path == "/jobs":
+            with service.lock:      # copies: workers change jobs while they run
+                jobs = [dict(job) for job in list(service.jobs.values())[-100:]]
+            self.reply(200, {"jobs": jobs})
+        elif self.path.startswith("/jobs/") and self.path[6:].isdigit():
+            with service.lock:
+                job = service.jobs.get(int(self.path[6:]))
+                job = dict(job) if job is not None else None
+            if job is None:
+                self.reply(404, {"error": "unknown job"})
+            else:
+                self.reply(200, job)
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self.reply(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            self.reply(202, self.server.service.submit(request))
+        except (ValueError, TypeError) as e:    # also invalid JSON
+            self.reply(400, {"error": str(e)})
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):      # no access log: jobs print their own lines
+        pass
+
+
+# ___ SIGTERM (process managers): stop like Ctrl-C
+def stop_service(signum, frame):
+    raise KeyboardInterrupt
+
+
+# ___ run the job service on 127.0.0.1:port until Ctrl-C or SIGTERM
+def run_service(settings, port=None, force=False):
+    port = port or settings.service_port
+    service = JobService(settings, force)
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), ServiceHandler)
+    except OSError as e:
+        raise WebexLogoError(f"can't start service on port {port}: {e}")
+    server.daemon_threads = True
+    server.service = service
+    print(f"2___ SERVICE: http://127.0.0.1:{port} (POST /jobs, GET /jobs/ID, GET /status), "
+          f"{len(service.devices)} device(s), {settings.service_workers} workers (Ctrl-C to stop)")
+    signal.signal(signal.SIGTERM, stop_service)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n     SERVICE stopped")
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Settings: read webexlogo_settings.ini (or create a template for it)."""
+import configparser     # for .ini support
+import os
+from .common import WebexLogoError
+
+configFile = "webexlogo_settings.ini"
+resample_names = ["nearest", "bilinear", "bicubic", "lanczos"]
+emaildomains = ["yahoo.com", "hotmail.com", "aol.com", "hotmail.co.uk", "hotmail.fr", "msn.com", "yahoo.fr", "wanadoo.fr", "orange.fr", "comcast.net", "yahoo.co.uk", "yahoo.com.br", "yahoo.co.in", "live.com", "rediffmail.com", "free.fr", "gmx.de", "web.de", "yandex.ru", "ymail.com", "libero.it", "outlook.com", "uol.com.br", "bol.com.br", "mail.ru", "cox.net", "hotmail.it", "sbcglobal.net", "sfr.fr", "live.fr", "verizon.net", "live.co.uk", "googlemail.com", "yahoo.es", "ig.com.br", "live.nl", "bigpond.com", "terra.com.br", "yahoo.it", "neuf.fr", "yahoo.de", "alice.it", "rocketmail.com", "att.net", "laposte.net", "facebook.com", "bellsouth.net", "yahoo.in", "hotmail.es", "charter.net", "yahoo.ca", "yahoo.com.au", "rambler.ru", "hotmail.de", "tiscali.it", "shaw.ca", "yahoo.co.jp", "sky.com", "earthlink.net", "optonline.net", "freenet.de", "t-online.de", "aliceadsl.fr", "virgilio.it", "home.nl", "qq.com", "telenet.be", "me.com", "yahoo.com.ar", "tiscali.co.uk", "yahoo.com.mx", "voila.fr", "gmx.net", "mail.com", "planet.nl", "tin.it", "live.it", "ntlworld.com", "arcor.de", "yahoo.co.id", "frontiernet.net", "hetnet.nl", "live.com.au", "yahoo.com.sg", "zonnet.nl", "club-internet.fr", "juno.com", "optusnet.com.au", "blueyonder.co.uk", "bluewin.ch", "skynet.be", "sympatico.ca", "windstream.net", "mac.com", "centurytel.net", "chello.nl", "live.ca", "aim.com", "bigpond.net.au"]
+
+
+class Settings:
+    """All settings from the .ini file, plus the logo area calculated from them.
+    Settings.load() reads the settings file, Settings.from_values() is for use
+    without a file (e.g. from other scripts)."""
+
+    def __init__(self, config):
+        self.config = config
+        self.endpoint_ip = self.get_from_ini("endpoint_ip")
+        self.my_inputfile = self.get_from_ini("my_inputfile")
+        self.my_logofolder = r'{}'.format(self.get_from_ini("my_logofolder"))
+        if self.my_logofolder[-1:] == "\\":
+            self.my_logofolder = r'{}'.format(self.my_logofolder[:-1])
+        if self.my_logofolder == "":
+            self.my_logofolder = "."
+        self.my_token_xapi = self.get_from_ini("my_token_xapi")
+        self.my_user_image_location = self.get_from_ini("my_user_image_location")
+        self.my_local_domain_toignore = self.get_from_ini("my_local_domain_toignore")
+        self.logo_start = self.get_from_ini("logo_start")
+        self.logo_end = self.get_from_ini("logo_end")
+        self.scale_logo = self.get_from_ini("scale_logo")
+        self.logo_resample = self.get_from_ini("logo_resample", "lanczos").lower()
+        self.max_logos = max(int(self.get_from_ini("max_logos", "1")), 1)
+        self.my_fontsize = int(self.get_from_ini("my_fontsize"))
+        self.my_fontcolor = self.get_from_ini("my_fontcolor")
+        self.my_fontfile = self.get_from_ini("my_fontfile")
+        self.fleet_inventory = self.get_from_ini("fleet_inventory", "webexlogo_devices.ini")
+        self.fleet_concurrency = int(self.get_from_ini("fleet_concurrency", "8"))
+        self.render_cache_mb = int(self.get_from_ini("render_cache_mb", "200"))
+        self.watch_interval = float(self.get_from_ini("watch_interval", "10"))
+        self.watch_debounce = int(self.get_from_ini("watch_debounce", "2"))
+        self.prefetch_workers = int(self.get_from_ini("prefetch_workers", "8"))
+        self.service_port = int(self.get_from_ini("service_port", "8765"))
+        self.service_workers = max(int(self.get_from_ini("service_workers", "4")), 1)
+        self.service_debounce = float(self.get_from_ini("service_debounce", "0.5"))
+        self.logo_cache_ttl = float(self.get_from_ini("logo_cache_ttl", "168")) * 3600
+        self.logo_missing_ttl = float(self.get_from_ini("logo_missing_ttl", "24")) * 3600
+        self.public_suffix_file = self.get_from_ini("public_suffix_file", "")
+        self.jpeg_quality = int(self.get_from_ini("jpeg_quality", "85"))
+        self.upload_max_kb = int(self.get_from_ini("upload_max_kb", "0"))
+        self.jpeg_min_psnr = float(self.get_from_ini("jpeg_min_psnr", "0"))
+        device_resolution = self.get_from_ini("device_resolution", "1920x1080").lower().replace(" ", "")
+        self.device_resolution = None       # None: upload images at their own size
+        if device_resolution not in ["", "0"]:
+            try:
+                self.device_resolution = (int(device_resolution.split("x")[0]), int(device_resolution.split("x")[1]))
+            except (IndexError, ValueError):
+                raise WebexLogoError(f"device_resolution '{device_resolution}' should be WIDTHxHEIGHT (like 1920x1080) or 0")
+        http_timeout = [float(value) for value in self.get_from_ini("http_timeout", "5,20").split(",")]
+        self.http_timeout = http_timeout[0] if len(http_timeout) == 1 else (http_timeout[0], http_timeout[1])
+
+        if not 30 <= self.jpeg_quality <= 95:
+            raise WebexLogoError(f"jpeg_quality {self.jpeg_quality} should be 30-95")
+        if self.logo_resample not in resample_names:
+            raise WebexLogoError(f"logo_resample '{self.logo_resample}' is not one of: {', '.join(resample_names)}")
+
+        self.emaildomains = set(emaildomains)      # set: fast check for each participant
+        if self.my_local_domain_toignore != "":
+            for items in self.my_local_domain_toignore.split(","):
+                self.emaildomains.add(items.strip().lower())
+        # convert easy to see/write variables to what I need.
+        self.startX, self.startY = int(self.logo_start.split("x")[0]), int(self.logo_start.split("x")[1])
+        self.endX, self.endY = int(self.logo_end.split("x")[0]), int(self.logo_end.split("x")[1])
+        if self.endY < self.startY or self.endX < self.startX:
+            raise WebexLogoError(f"EndX({self.endX}) should be > StartX({self.startX}) and\n          EndY({self.endY}) should be > StartY({self.startY})")
+        self.max_w = self.endX - self.startX
+        self.max_h = self.endY - self.startY
+        self.middle_x = int(self.startX + (self.endX - self.startX)/2)
+        self.middle_y = int(self.startY + (self.endY - self.startY)/2)
+
+    # ___ Read key from .ini file. Optional keys have a default value
+    def get_from_ini(self, key, default=None):
+        config = self.config
+        if config.has_option('Settings', key):  # does the key exist?
+            key_value = config['Settings'][key]
+            if key == "scale_logo":             # this should be a boolean
+                key_value = config.getboolean('Settings',key)
+            elif len(key_value) > 0 and key_value[0] == "_" and key_value[-1:] == "_":
+                # key is present but has not been configured
+                raise WebexLogoError(f"please configure item '{key}' in the .ini file")
+            return key_value
+        elif default is not None:               # optional key: use default value
+            return default
+        else:
+            raise WebexLogoError(f"missing entry in .ini file: {key}\nAdd this key or rename the .ini file to create a new one.")
+
+    # ___ Read .ini file, if it doesn't exist: create an empty template (and stop)
+    @classmethod
+    def load(cls, filename=configFile):
+        if not os.path.isfile(filename):
+            create_settings_file(filename)
+        config = configparser.ConfigParser(allow_no_value=True)
+        try:
+            config.read(filename)
+            return cls(config)
+        except WebexLogoError:
+            raise
+        except Exception as e:  # Error: keys missing from .ini file
+            raise WebexLogoError(f"reading settings file.\n    ERROR: {e}")
+
+    # ___ settings without a file: Settings.from_values(endpoint_ip="10.1.1.21", ...)
+    @classmethod
+    def from_values(cls, **values):
+        config = configparser.ConfigParser(allow_no_value=True)
+        config.read_dict({'Settings': {key: str(value) for key, value in values.items()}})
+        return cls(config)
+
+
+# ----------- CONFIG FILE: CREATE new config file because it does not exist
+def create_settings_file(filename=configFile):
+    try:
+        config = configparser.ConfigParser(allow_no_value=True)
+        config.add_section('Settings')
+        config.set('Settings', 'endpoint_ip  ', '_VIDEO_UNIT_IP_ADDRESS_')
+        config.set('Settings', '; ---- IP address of your video unit (has to be accessible by this computer)')
+        config.set('Settings', 'my_inputfile ', '_BACKGROUND_IMAGE_FILENAME_')
+        config.set('Settings', '; ---- Base image of your virtual background')
+        config.set('Settings', 'my_logofolder', '')
+        config.set('Settings', '; ---- foldername where downloaded images are cached. Empty: current folder')
+        config.set('Settings', 'my_token_xapi', '_YOUR_VIDEO_TOKEN_')
+        config.set('Settings', '; ---- Token to access your video endpoint. See docs for explanation')
+        config.set('Settings', 'my_user_image_location  ', 'User3')
+        config.set('Settings', '; ---- Slot name for your virtual background: user1, user2 or user3')
+        config.set('Settings', 'my_local_domain_toignore', '')
+        config.set('Settings', '; ---- When checking active call participants, ignore users from this domain')
+        config.set('Settings', ';      You want your CUSTOMER logo, not yours. Allowed: comma separated list')
+        config.set('Settings', 'logo_start  ', '_LOGO_START_XxY_')
+        config.set('Settings', 'logo_end    ', '_LOGO_END_XxY_')
+        config.set('Settings', '; ---- START and END coordinates of area where logo and text can be placed in (XxY)')
+        config.set('Settings', 'scale_logo  ', 'True')
+        config.set('Settings', '; ---- Increase your logo size to fit your defined area? Default: True')
+        config.set('Settings', 'logo_resample', 'lanczos')
+        config.set('Settings', '; ---- Logo resize filter: lanczos (sharpest), bicubic, bilinear or nearest (fastest, jagged edges)')
+        config.set('Settings', 'max_logos', '1')
+        config.set('Settings', '; ---- Participants/watch mode: show the logos of this many external domains (most participants first)')
+        config.set('Settings', 'my_fontsize ', '36')
+        config.set('Settings', '; ---- The max font size when embedding text in your virtual background')
+        config.set('Settings', 'my_fontcolor', 'yellow')
+        config.set('Settings', '; ---- Font color when you embed text on your virtual background (text or #hex)')
+        config.set('Settings', 'my_fontfile ', '')
+        config.set('Settings', '; ---- Font file used when embedding text in your virtual background (empty=Arial)')
+        config.set('Settings', 'fleet_inventory', 'webexlogo_devices.ini')
+        config.set('Settings', '; ---- Device list for "fleet" commands: one [section] per device with endpoint_ip,')
+        config.set('Settings', ';      my_token_xapi and my_user_image_location (optional, default: value above)')
+        config.set('Settings', 'fleet_concurrency', '8')
+        config.set('Settings', '; ---- Max number of devices updated at the same time in "fleet" mode')
+        config.set('Settings', 'render_cache_mb', '200')
+        config.set('Settings', '; ---- Max size (MB) of the cache with created backgrounds in my_logofolder. 0: no cache')
+        config.set('Settings', 'watch_interval', '10')
+        config.set('Settings', '; ---- "watch" command: check call participants every X seconds')
+        config.set('Settings', 'watch_debounce', '2')
+        config.set('Settings', '; ---- "watch" command: only change the logo after X checks with the same result')
+        config.set('Settings', 'prefetch_workers', '8')
+        config.set('Settings', '; ---- "prefetch" command: max number of logo downloads at the same time')
+        config.set('Settings', 'service_port', '8765')
+        config.set('Settings', '; ---- "serve" command: HTTP port of the job service (only on this computer: 127.0.0.1)')
+        config.set('Settings', 'service_workers', '4')
+        config.set('Settings', '; ---- "serve" command: max number of jobs processed at the same time')
+        config.set('Settings', 'service_debounce', '0.5')
+        config.set('Settings', '; ---- "serve" command: seconds a job waits; a newer job for the same device + slot replaces it')
+        config.set('Settings', 'logo_cache_ttl', '168')
+        config.set('Settings', '; ---- Hours before a downloaded logo is checked for changes (only downloads it if changed)')
+        config.set('Settings', 'logo_missing_ttl', '24')
+        config.set('Settings', '; ---- Hours to remember that there is no logo for a domain (no download attempt)')
+        config.set('Settings', 'public_suffix_file', '')
+        config.set('Settings', '; ---- Copy of https://publicsuffix.org/list/public_suffix_list.dat: finds the customer domain of')
+        config.set('Settings', ';      any subdomain (eu.acme.co.uk -> acme.co.uk). Empty: built-in list of the most used suffixes')
+        config.set('Settings', 'http_timeout', '5,20')
+        config.set('Settings', '; ---- Logo download timeouts in seconds: connect,read')
+        config.set('Settings', 'jpeg_quality', '85')
+        config.set('Settings', '; ---- Max JPEG quality of the uploaded background (30-95)')
+        config.set('Settings', 'upload_max_kb', '0')
+        config.set('Settings', '; ---- Max size (kB) of the uploaded background: lowers the JPEG quality until it fits. 0: no max')
+        config.set('Settings', 'jpeg_min_psnr', '0')
+        config.set('Settings', ';      Lowest quality the uploaded background may have (PSNR in dB, 40: hard to see, 35: visible)')
+        config.set('Settings', ';      The smallest JPEG with at least this quality is uploaded. 0: always use jpeg_quality')
+        config.set('Settings', 'device_resolution', '1920x1080')
+        config.set('Settings', '; ---- Larger base images and backgrounds are resized (and cropped) to this size before upload. 0: as is')
+        with open(filename, 'w') as configfile:
+            config.write(configfile)
+    except Exception as e:  # Error creating config file
+        raise WebexLogoError(f"creating config file.\n    ERROR: {e}")
+    raise WebexLogoError("configuration .ini file does not exist\n  ---> open the generated .ini file to configure this script", note=True)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Per-stage timing. Code marks its stages with
+
+    with trace.stage("encode") as span:
+        ...
+        span.add(bytes=len(image_bytes))
+
+Stages can be nested (per thread). When tracing is off (default) a stage is a
+shared do-nothing object. At the end of a run: a summary table, a JSON lines
+file, a Chrome trace file (chrome://tracing, ui.perfetto.dev) and/or a cProfile dump."""
+import json
+import os
+import threading
+import time
+
+enabled = False
+spans = []                  # finished stages
+span_lock = threading.Lock()
+local = threading.local()   # per thread: stack of open stages
+trace_start = time.perf_counter()
+options = {"timing": False, "trace_file": None, "profile_file": None}
+profiler = None
+
+
+class Span:
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info
+
+    def __enter__(self):
+        stack = local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1].name if stack else None
+        self.path = (stack[-1].path if stack else ()) + (self.name,)
+        self.depth = len(stack)
+        self.thread = threading.current_thread().name
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        local.stack.pop()
+        if exc_type is not None:
+            self.info["error"] = exc_type.__name__
+        with span_lock:
+            spans.append(self)
+        return False
+
+    def add(self, **info):
+        self.info.update(info)
+
+
+class NoSpan:       # tracing off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def add(self, **info):
+        pass
+
+
+no_span = NoSpan()
+
+
+# ___ a timed stage (context manager). info: extra values, e.g. sizes
+def stage(name, **info):
+    if not enabled:
+        return no_span
+    return Span(name, info)
+
+
+# ___ add values (e.g. bytes) to the current stage of this thread
+def add(**info):
+    if enabled and getattr(local, "stack", None):
+        local.stack[-1].info.update(info)
+
+
+# ___ start tracing. timing: print summary table. trace_file: .json = Chrome trace,
+#     else JSON lines. profile_file: cProfile dump (+ top functions printed)
+def start(timing=False, trace_file=None, profile_file=None):
+    global enabled, trace_start, profiler
+    options.update(timing=timing, trace_file=trace_file, profile_file=profile_file)
+    enabled = bool(timing or trace_file or profile_file)
+    trace_start = time.perf_counter()
+    spans.clear()
+    if profile_file:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+
+# ___ end of run: write the trace and profile files, print the summary
+def finish():
+    global enabled, profiler
+    if not enabled:
+        return
+    enabled = False
+    if profiler is not None:
+        profiler.disable()
+        write_profile(profiler, options["profile_file"])
+        profiler = None
+    trace_file = options["trace_file"]
+    if trace_file:
+        if trace_file.endswith(".json"):
+            write_chrome_trace(trace_file)
+        else:
+            write_jsonl(trace_file)
+    if options["timing"] or trace_file:
+        print_summary()
+
+
+def span_record(span):
+    record = {"name": span.name, "start_ms": round((span.start - trace_start) * 1000, 3),
+              "duration_ms": round(span.duration * 1000, 3), "thread": span.thread,
+              "depth": span.depth, "parent": span.parent}
+    record.update(span.info)
+    return record
+
+
+def write_jsonl(filename):
+    try:
+        with open(filename, 'w') as f:
+            for span in sorted(spans, key=lambda span: span.start):
+                f.write(json.dumps(span_record(span)) + "\n")
+        print(f"     TRACE: {len(spans)} stages written to '{filename}' (JSON lines)")
+    except OSError as e:
+        print(f"     *NOTE* trace not saved: {e}")
+
+
+def write_chrome_trace(filename):
+    events = []
+    thread_ids = dict()
+    for span in sorted(spans, key=lambda span: span.start):
+        thread_id = thread_ids.setdefault(span.thread, len(thread_ids) + 1)
+        events.append({"name": span.name, "ph": "X", "pid": os.getpid(), "tid": thread_id,
+                       "ts": round((span.start - trace_start) * 1e6), "dur": round(span.duration * 1e6),
+                       "args": span.info})
+    for thread_name, thread_id in thread_ids.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread_id, "args": {"name": thread_name}})
+    try:
+        with open(filename, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"     TRACE: {len(spans)} stages written to '{filename}' (Chrome trace)")
+    except OSError as e:
+        print(f"     *NOTE* trace not saved: {e}")
+
+
+def write_profile(profiler, filename):
+    import pstats
+    try:
+        profiler.dump_stats(filename)
+        print(f"     PROFILE: saved to '{filename}' (python -m pstats {filename})")
+    except OSError as e:
+        print(f"     *NOTE* profile not saved: {e}")
+    print("     PROFILE: top functions (cumulative time)")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+
+# ___ summary: per stage (nested stages indented) the count, total and max time and sizes.
+#     Stages with the same path (names of the stage and its parents) are added up
+def print_summary():
+    rows = dict()       # path -> totals
+    for span in sorted(spans, key=lambda span: span.start):
+        row = rows.setdefault(span.path, {"first": span.start, "count": 0, "total": 0.0, "max": 0.0, "bytes": 0})
+        row["count"] += 1
+        row["total"] += span.duration
+        row["max"] = max(row["max"], span.duration)
+        row["bytes"] += sum(value for key, value in span.info.items() if key.endswith("bytes") and isinstance(value, int))
+    total_time = time.perf_counter() - trace_start
+    print(f"____ TIMING (total {total_time * 1000:.0f} ms)")
+    print(f"     {'STAGE':<34}{'COUNT':>6}{'TOTAL ms':>10}{'MAX ms':>9}{'kB':>9}")
+    # tree order: sort by the first start of the stage and each of its parents
+    tree_order = lambda path: tuple(rows[path[:depth]]["first"] if path[:depth] in rows else 0 for depth in range(1, len(path) + 1))
+    for path in sorted(rows, key=tree_order):
+        row = rows[path]
+        stage_name = ("  " * (len(path) - 1) + path[-1])[:33]
+        kilobytes = f"{row['bytes'] / 1024:.0f}" if row["bytes"] else "-"
+        print(f"     {stage_name:<34}{row['count']:>6}{row['total'] * 1000:>10.1f}{row['max'] * 1000:>9.1f}{kilobytes:>9}")
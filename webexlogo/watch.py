@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Watch mode: follow the participants of the active call on one device."""
+import time
+from .common import beep, WebexLogoError
+from .device import top_domains
+from .backgrounds import render_background
+from . import trace
+
+
+# ___ update the device background for a watch mode change. domain None: plain background
+#     domain can be a comma separated list of domains (one logo per domain)
+#     RETURNS: True if the device shows the new background
+def watch_update(settings, client, domain, force=False):
+    try:
+        with trace.stage("watch update", domain=domain):
+            image_bytes, new_slot = render_background(settings, client, "clear" if domain is None else domain)
+            errors = client.push_background(image_bytes, settings.my_user_image_location, fleet=True, force=force)
+    except WebexLogoError as e:     # e.g. logo download failed: keep watching
+        errors = [f"background not created: {e}"]
+    except Exception as e:  # e.g. downloaded logo is not an image: keep watching
+        errors = [f"background not created: {type(e).__name__}: {e}"]
+    if errors:
+        print(f"     **ERROR** updating background: {'; '.join(errors)} (tried again at the next check)")
+    else:
+        print(f"     {client.timing_summary()}")
+    beep(1)
+    return not errors
+
+
+# ___ watch the active call: show the logo of the top external domain (max_logos > 1: the
+#     logos of the top domains), plain when the call ends.
+#     A change is only used after watch_debounce checks with the same result. A failed
+#     update is tried again at the next check.
+def run_watch(settings, client, force=False):
+    watch_interval = settings.watch_interval
+    print(f"2___ WATCH: checking call participants on {client.endpoint_ip} every {watch_interval:g}s (Ctrl-C to stop)")
+    shown_domain = None             # logo on the device. None: plain background
+    new_domain, new_domain_count = None, 0
+    try:
+        while True:
+            try:
+                domain_counts, participants, error = client.count_call_domains(settings.emaildomains, raise_on_error=False)
+                if error and "not found" not in error:
+                    print(f"     *NOTE* can't read participants: {error}")
+                else:
+                    if error:       # not found: no (more) active call
+                        top_domain = None
+                    else:
+                        top_domain = ",".join(top_domains(domain_counts, settings.max_logos)) or None   # max_logos > 1: "a.com,b.com"
+                    if top_domain == new_domain:
+                        new_domain_count += 1
+                    else:
+                        new_domain, new_domain_count = top_domain, 1
+                    if new_domain != shown_domain and new_domain_count >= settings.watch_debounce:
+                        print(f"\n{time.strftime('%H:%M:%S')} ___ {'call ended / no external users: plain background' if new_domain is None else 'new top domain: ' + new_domain}")
+                        if watch_update(settings, client, new_domain, force):
+                            shown_domain = new_domain
+            except Exception as e:  # e.g. malformed participant list: keep watching
+                print(f"     *NOTE* watch check failed: {type(e).__name__}: {e}")
+            time.sleep(watch_interval)
+    except KeyboardInterrupt:
+        print("\n     WATCH stopped")